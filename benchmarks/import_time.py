@@ -0,0 +1,100 @@
+"""各ページのモジュールの読み込み時間（コールドスタート）を計測する
+
+モジュールごとに新しいPythonプロセスで `python -X importtime` を実行し、
+読み込みにかかった時間と、パッケージごとの内訳を表示する:
+
+    python -m benchmarks.import_time --repeat 5
+"""
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+from typing import Dict, List, Optional
+
+# 計測するモジュール（streamlitはどのページでも必要な下限の目安）
+TARGETS = [
+    'streamlit',
+    'components.population_time_series',
+    'components.population_heatmap',
+]
+
+# 読み込まれたかどうかを確認する重い依存パッケージ
+HEAVY_PACKAGES = ['geopandas', 'shapely', 'pyogrio', 'folium', 'streamlit_folium', 'plotly']
+
+def _measure_once(module: str) -> dict:
+    """新しいプロセスでモジュールを読み込み、-X importtimeの出力を集計する"""
+    check = (
+        f'import sys, json, {module}; '
+        f'print(json.dumps([name for name in {HEAVY_PACKAGES!r} if name in sys.modules]))'
+    )
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', check],
+        capture_output=True, text=True, check=True
+    )
+
+    # 各行は "import time: 自身(us) | 累積(us) | モジュール名"
+    total_us = 0
+    package_us: Dict[str, int] = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|')
+        name = name.strip()
+        if name == module:
+            total_us = int(cumulative_us)
+        # 自身の時間をトップレベルのパッケージごとに合計する
+        package = name.split('.')[0]
+        package_us[package] = package_us.get(package, 0) + int(self_us)
+
+    return {
+        'total_ms': (total_us or sum(package_us.values())) / 1000,
+        'package_ms': {name: us / 1000 for name, us in package_us.items()},
+        'heavy_loaded': json.loads(result.stdout.strip().splitlines()[-1]),
+    }
+
+def measure(module: str, repeat: int) -> dict:
+    """モジュールの読み込み時間をrepeat回計測し、中央値などを返す"""
+    runs = [_measure_once(module) for _ in range(repeat)]
+    totals = [run['total_ms'] for run in runs]
+    # パッケージ別の内訳は中央値に最も近い回のものを使う
+    median = statistics.median(totals)
+    representative = min(runs, key=lambda run: abs(run['total_ms'] - median))
+    breakdown = sorted(
+        representative['package_ms'].items(), key=lambda item: -item[1]
+    )
+    return {
+        'module': module,
+        'repeat': repeat,
+        'median_ms': median,
+        'min_ms': min(totals),
+        'max_ms': max(totals),
+        'heavy_loaded': representative['heavy_loaded'],
+        'breakdown_ms': dict(breakdown[:15]),
+    }
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description='ページのモジュールの読み込み時間を計測する')
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--output', type=Path, default=None)
+    parser.add_argument('modules', nargs='*', default=TARGETS)
+    args = parser.parse_args(argv)
+
+    results = []
+    for module in args.modules:
+        result = measure(module, args.repeat)
+        results.append(result)
+        print(f"\n{module}: median {result['median_ms']:.0f} ms"
+              f" (min {result['min_ms']:.0f} / max {result['max_ms']:.0f})")
+        print(f"  重い依存: {', '.join(result['heavy_loaded']) or 'なし'}")
+        for name, ms in result['breakdown_ms'].items():
+            print(f'  {name:<24} {ms:8.1f} ms')
+
+    if args.output:
+        args.output.parent.mkdir(parents=True, exist_ok=True)
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,285 @@
+"""複数セッションの同時アクセスを再現する負荷試験
+
+streamlit.testingのAppTestで各ページを画面なしで実行し、セッションごとに
+年月の変更・チェックボックスの切り替え・地域の選択などの操作を続けて行う。
+セッションはスレッドで並行に動かす（Streamlitのサーバーも1プロセス内の
+スレッドでセッションを処理するため、1インスタンスあたりの処理能力の目安になる）。
+--no-warmupを指定した場合は、セッション数ごとにディスク上のキャッシュを削除し、
+新しいプロセスで計測する（再起動直後の状況）。リポジトリのルートで実行する:
+
+    python -m benchmarks.load_test --sessions 1 4 16 --interactions 10
+"""
+import argparse
+import json
+import logging
+import multiprocessing
+import platform
+import random
+import resource
+import shutil
+import sys
+import threading
+import time
+import warnings
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+import numpy as np
+from streamlit.testing.v1 import AppTest
+
+from benchmarks.run_benchmarks import RESULTS_DIR, _git_commit
+
+# 各ページを実行するスクリプト（main.pyのナビゲーションを通さずに直接呼び出す）
+PAGE_SCRIPTS = {
+    'heatmap': 'from components import population_heatmap\npopulation_heatmap.run()\n',
+    'time_series': (
+        'from components import population_time_series\n'
+        'population_time_series.run()\n'
+    ),
+}
+
+# 1回の再実行の待ち時間の上限（秒）
+RUN_TIMEOUT = 300
+
+def _toggle(at: AppTest, key: str) -> None:
+    checkbox = at.checkbox(key=key)
+    checkbox.set_value(not checkbox.value)
+
+def _heatmap_interaction(at: AppTest, rng: random.Random) -> str:
+    """ヒートマップページで1回の操作を行い、操作の名前を返す"""
+    action = rng.choices(
+        ['month', 'schools', 'stations', 'slider'], weights=[6, 2, 1, 1]
+    )[0]
+    if action == 'month':
+        selector = at.selectbox(key='year_selector')
+        # 最近の年月ほど選ばれやすくする
+        index = min(int(rng.expovariate(0.3)), len(selector.options) - 1)
+        selector.select(selector.options[index])
+    elif action == 'schools':
+        _toggle(at, rng.choice(['elementary_schools', 'junior_high_schools']))
+    elif action == 'stations':
+        _toggle(at, 'stations')
+    else:
+        _toggle(at, 'month_slider')
+    return action
+
+def _time_series_interaction(at: AppTest, rng: random.Random) -> str:
+    """人口推移グラフページで1回の操作を行い、操作の名前を返す"""
+    action = rng.choices(
+        ['areas', 'graph_type', 'all_towns'], weights=[5, 3, 1]
+    )[0]
+    if action == 'areas' and not at.checkbox(key='all_towns').value:
+        areas = at.multiselect[0]
+        areas.set_value(rng.sample(areas.options, rng.randint(1, 5)))
+    elif action == 'graph_type':
+        graph_type = next(radio for radio in at.radio if radio.label == 'グラフの種類を選択')
+        graph_type.set_value(rng.choice(graph_type.options))
+    else:
+        action = 'all_towns'
+        _toggle(at, 'all_towns')
+    return action
+
+INTERACTIONS: Dict[str, Callable[[AppTest, random.Random], str]] = {
+    'heatmap': _heatmap_interaction,
+    'time_series': _time_series_interaction,
+}
+
+def _run_session(page: str, interactions: int, seed: int) -> List[dict]:
+    """1つのセッションで最初の表示と操作を行い、再実行ごとの記録を返す"""
+    rng = random.Random(seed)
+    at = AppTest.from_string(PAGE_SCRIPTS[page], default_timeout=RUN_TIMEOUT)
+
+    records = []
+    action = 'initial'
+    for step in range(interactions + 1):
+        if step > 0:
+            action = INTERACTIONS[page](at, rng)
+        start = time.perf_counter()
+        at.run()
+        records.append({
+            'page': page,
+            'action': action,
+            'latency_ms': (time.perf_counter() - start) * 1000,
+            'errors': len(at.exception) + len(at.error),
+        })
+    return records
+
+def _peak_rss_mb() -> float:
+    """プロセスの最大常駐メモリ（MB）"""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linuxはキロバイト、macOSはバイト単位
+    return peak / 1024 ** 2 if sys.platform == 'darwin' else peak / 1024
+
+def _summarize(latencies: List[float]) -> dict:
+    values = np.asarray(latencies)
+    p50, p95, p99 = np.percentile(values, [50, 95, 99])
+    return {
+        'count': int(values.size),
+        'p50_ms': float(p50),
+        'p95_ms': float(p95),
+        'p99_ms': float(p99),
+        'max_ms': float(values.max()),
+    }
+
+def run_load(
+    pages: List[str],
+    sessions: int,
+    interactions: int,
+    seed: int
+) -> dict:
+    """sessions個のセッションを同時に動かし、再実行の待ち時間と処理量を集計する
+
+    セッションは指定したページに順番に割り当てる
+    """
+    # セッションの開始をそろえ、同時にアクセスした状況を再現する
+    barrier = threading.Barrier(sessions)
+
+    def session(i: int) -> List[dict]:
+        barrier.wait()
+        return _run_session(pages[i % len(pages)], interactions, seed + i)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=sessions, thread_name_prefix='session') as executor:
+        records = [
+            record
+            for session_records in executor.map(session, range(sessions))
+            for record in session_records
+        ]
+    elapsed = time.perf_counter() - start
+
+    by_page = {
+        page: _summarize([r['latency_ms'] for r in records if r['page'] == page])
+        for page in pages
+        if any(r['page'] == page for r in records)
+    }
+    by_action = {
+        action: _summarize([r['latency_ms'] for r in records if r['action'] == action])
+        for action in sorted({r['action'] for r in records})
+    }
+    return {
+        'sessions': sessions,
+        'interactions': interactions,
+        'elapsed_s': elapsed,
+        'reruns': len(records),
+        'throughput_rps': len(records) / elapsed,
+        'errors': sum(r['errors'] for r in records),
+        'peak_rss_mb': _peak_rss_mb(),
+        'latency': _summarize([r['latency_ms'] for r in records]),
+        'by_page': by_page,
+        'by_action': by_action,
+    }
+
+def _quiet_logs() -> None:
+    """AppTestの実行環境に関する警告は計測に関係ないため表示しない"""
+    # Streamlitはモジュールごとにロガーのレベルを設定しているため個別に下げる
+    for name in list(logging.root.manager.loggerDict):
+        if name.startswith('streamlit'):
+            logging.getLogger(name).setLevel(logging.ERROR)
+    warnings.filterwarnings('ignore', category=UserWarning, module='folium')
+
+def _clear_disk_caches() -> None:
+    """ディスク上のストア・シートカタログ・描画済みの地図を削除する"""
+    from core import population_store, sheet_catalog
+    from utils.map_render_cache import RENDER_CACHE_DIR
+
+    for path in (
+        population_store.STORE_PATH,
+        population_store.MANIFEST_PATH,
+        sheet_catalog.CATALOG_PATH,
+    ):
+        Path(path).unlink(missing_ok=True)
+    shutil.rmtree(RENDER_CACHE_DIR, ignore_errors=True)
+
+def _run_cold_load(
+    pages: List[str],
+    sessions: int,
+    interactions: int,
+    seed: int
+) -> dict:
+    """新しいプロセスで呼び出し、プロセス内のキャッシュがない状態で計測する"""
+    _quiet_logs()
+    return run_load(pages, sessions, interactions, seed)
+
+def run_cold_load(
+    pages: List[str],
+    sessions: int,
+    interactions: int,
+    seed: int
+) -> dict:
+    """再起動直後の状況を再現して計測する
+
+    ディスク上のキャッシュを削除し、前のセッション数の計測で作られたプロセス内の
+    キャッシュも使わないよう、新しいプロセス（spawn）で計測する
+    """
+    _clear_disk_caches()
+    context = multiprocessing.get_context('spawn')
+    with ProcessPoolExecutor(max_workers=1, mp_context=context) as executor:
+        return executor.submit(
+            _run_cold_load, pages, sessions, interactions, seed
+        ).result()
+
+def _print_result(result: dict) -> None:
+    latency = result['latency']
+    print(f"\nセッション数 {result['sessions']}: {result['reruns']}回の再実行 / "
+          f"{result['elapsed_s']:.1f} 秒 ({result['throughput_rps']:.1f} 回/秒)"
+          f"  最大RSS {result['peak_rss_mb']:.0f} MB  エラー {result['errors']}")
+    rows = {'全体': latency, **result['by_page'], **result['by_action']}
+    for name, stats in rows.items():
+        print(f"  {name:<14} p50 {stats['p50_ms']:8.1f}  p95 {stats['p95_ms']:8.1f}"
+              f"  p99 {stats['p99_ms']:8.1f}  max {stats['max_ms']:8.1f} ms"
+              f"  ({stats['count']}回)")
+
+def main(argv: Optional[List[str]] = None) -> Path:
+    parser = argparse.ArgumentParser(description='複数セッションの同時アクセスを再現する負荷試験')
+    parser.add_argument('--sessions', type=int, nargs='+', default=[1, 4, 16])
+    parser.add_argument('--interactions', type=int, default=10,
+                        help='セッションごとの操作の回数（最初の表示は含まない）')
+    parser.add_argument('--pages', nargs='+', choices=list(PAGE_SCRIPTS),
+                        default=list(PAGE_SCRIPTS))
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--no-warmup', action='store_true',
+                        help='計測前にキャッシュを温めず、セッション数ごとにディスク上の'
+                             'キャッシュを削除して新しいプロセスで計測する（再起動直後の状況）')
+    parser.add_argument('--output', type=Path, default=None,
+                        help='結果のJSONファイル（省略時はbenchmarks/results/に保存）')
+    args = parser.parse_args(argv)
+
+    _quiet_logs()
+
+    if not args.no_warmup:
+        # 各ページを1回表示し、プロセス内のキャッシュを作っておく
+        for page in args.pages:
+            _run_session(page, 0, args.seed)
+
+    results = []
+    for sessions in args.sessions:
+        load = run_cold_load if args.no_warmup else run_load
+        result = load(args.pages, sessions, args.interactions, args.seed)
+        _print_result(result)
+        results.append(result)
+
+    started_at = datetime.now()
+    report = {
+        'meta': {
+            'timestamp': started_at.isoformat(timespec='seconds'),
+            'git_commit': _git_commit(),
+            'python': sys.version.split()[0],
+            'platform': platform.platform(),
+            'pages': args.pages,
+            'seed': args.seed,
+            'warmup': not args.no_warmup,
+        },
+        'results': results,
+    }
+
+    output = args.output or RESULTS_DIR / f'load-{started_at:%Y%m%d-%H%M%S}.json'
+    output.parent.mkdir(parents=True, exist_ok=True)
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    print(f'\n結果を保存しました: {output}')
+    return output
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,246 @@
+"""データ読み込みから地図のHTML生成までの各段階を計測するベンチマーク
+
+合成データ（benchmarks.synthetic_data）の町丁目数・月数を変えながら計測し、
+結果をJSONで保存する。リポジトリのルートで実行する:
+
+    python -m benchmarks.run_benchmarks --towns 100 1000 --months 12 60
+"""
+import argparse
+import json
+import logging
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import warnings
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, List, Optional
+
+from benchmarks.synthetic_data import generate_dataset
+from core import geometry_registry, population_store, sheet_catalog
+from utils.constants import CENTER_LAT, CENTER_LON, POPULATION_DATA_FILES
+from core.data_loader import (
+    ColumnNames, DataPaths, load_data, parse_sheets,
+    read_choufu_population_excel_sheet, resolve_sheet_info
+)
+from core.geometry_registry import (
+    apply_geometry_lod, get_label_points, get_town_geometry, LOD_LEVELS
+)
+from utils.map_components import (
+    add_area_labels, add_population_layer, create_base_map, create_layer_group
+)
+from core.population_history import build_population_history
+
+# 結果の保存先
+RESULTS_DIR = Path('benchmarks/results')
+
+def _time_stage(
+    func: Callable[[], object],
+    repeat: int,
+    setup: Optional[Callable[[], None]] = None
+) -> dict:
+    """関数をrepeat回実行し、実行時間（ミリ秒）の統計を返す
+
+    setupは各回の前に実行し、計測には含めない
+    """
+    timings = []
+    for _ in range(repeat):
+        if setup is not None:
+            setup()
+        start = time.perf_counter()
+        func()
+        timings.append((time.perf_counter() - start) * 1000)
+    return {
+        'repeat': repeat,
+        'min_ms': min(timings),
+        'median_ms': statistics.median(timings),
+        'mean_ms': statistics.fmean(timings),
+        'max_ms': max(timings),
+    }
+
+def _use_dataset(dataset: dict, cache_dir: Path) -> None:
+    """アプリの読み込み先を合成データとベンチマーク用のキャッシュに切り替える"""
+    # 各モジュールが同じ辞書を参照しているため、中身を入れ替える
+    POPULATION_DATA_FILES.clear()
+    POPULATION_DATA_FILES.update(dataset['population_files'])
+    DataPaths.TOPOJSON_PATH = dataset['topojson']
+
+    population_store.STORE_PATH = cache_dir / 'population.parquet'
+    population_store.MANIFEST_PATH = cache_dir / 'population_manifest.json'
+    sheet_catalog.CATALOG_PATH = cache_dir / 'sheet_catalog.json'
+    _clear_memory_caches()
+
+def _clear_memory_caches() -> None:
+    """プロセス内のキャッシュを破棄する（ディスク上のキャッシュは残す）"""
+    population_store._loaded_store.update({'fingerprint': None, 'sheets': {}})
+    sheet_catalog._catalog = None
+    sheet_catalog._catalog_files = None
+    geometry_registry.clear_town_geometry()
+
+def _clear_disk_caches() -> None:
+    """ディスク上のストアとカタログを削除する"""
+    for path in (
+        population_store.STORE_PATH,
+        population_store.MANIFEST_PATH,
+        sheet_catalog.CATALOG_PATH,
+    ):
+        Path(path).unlink(missing_ok=True)
+
+def _clear_all_caches() -> None:
+    _clear_memory_caches()
+    _clear_disk_caches()
+
+def _build_map(data, lod: int):
+    """ヒートマップのページと同じ構成で地図を組み立てる"""
+    map_obj = create_base_map(CENTER_LAT, CENTER_LON)
+    add_area_labels(map_obj, get_label_points())
+    population_group = create_layer_group('population')
+    add_population_layer(
+        population_group, apply_geometry_lod(data, lod),
+        [ColumnNames.ADDRESS, ColumnNames.POPULATION]
+    )
+    population_group.add_to(map_obj)
+    return map_obj
+
+def run_case(n_towns: int, n_months: int, repeat: int, work_dir: Path) -> dict:
+    """1つのデータ規模について全段階を計測する"""
+    dataset = generate_dataset(work_dir / 'data', n_towns, n_months)
+    _use_dataset(dataset, work_dir / 'cache')
+
+    catalog = sheet_catalog.build_sheet_catalog()
+    sheet_infos = [entry.sheet_info for entry in catalog.entries]
+    latest = sheet_infos[0]
+    stages = {}
+
+    # Excelの読み込み（1シートをpandasで / 全シートをワークブックごとに一括で）
+    file_key, sheet_name = resolve_sheet_info(latest)
+    stages['excel_parse_one_sheet'] = _time_stage(
+        lambda: read_choufu_population_excel_sheet(
+            POPULATION_DATA_FILES[file_key], sheet_name
+        ),
+        repeat
+    )
+    stages['excel_parse_all_sheets'] = _time_stage(
+        lambda: parse_sheets(sheet_infos), repeat
+    )
+
+    # シートカタログとカラムナーストア
+    stages['catalog_build'] = _time_stage(
+        sheet_catalog.get_sheet_catalog, repeat, setup=_clear_all_caches
+    )
+    stages['catalog_warm'] = _time_stage(sheet_catalog.get_sheet_catalog, repeat)
+    stages['store_build'] = _time_stage(
+        population_store.load_population_store, repeat, setup=_clear_all_caches
+    )
+    stages['store_load_disk'] = _time_stage(
+        population_store.load_population_store, repeat, setup=_clear_memory_caches
+    )
+
+    # TopoJSONのデコードとLODごとの簡略化
+    stages['topojson_decode'] = _time_stage(
+        get_town_geometry, repeat, setup=geometry_registry.clear_town_geometry
+    )
+    coarsest_lod = len(LOD_LEVELS) - 1
+    stages['topojson_simplify'] = _time_stage(
+        lambda: geometry_registry.get_town_geometry_lod(coarsest_lod),
+        repeat,
+        setup=lambda: geometry_registry._simplified_geometry.clear()
+    )
+
+    # 境界データと人口データのマージ、履歴の作成
+    stages['merge_one_month'] = _time_stage(lambda: load_data(latest), repeat)
+    stages['history_build'] = _time_stage(build_population_history, repeat)
+
+    # 地図の組み立てとHTMLへのシリアライズ
+    data = load_data(latest)
+    html_bytes = {}
+    for lod in range(len(LOD_LEVELS)):
+        # 簡略化はtopojson_simplifyで計測済みのため、事前に済ませておく
+        geometry_registry.get_town_geometry_lod(lod)
+        stages[f'folium_build_lod{lod}'] = _time_stage(
+            lambda: _build_map(data, lod), repeat
+        )
+        map_obj = _build_map(data, lod)
+        stages[f'html_serialize_lod{lod}'] = _time_stage(
+            lambda: map_obj.get_root().render(), repeat
+        )
+        html_bytes[f'lod{lod}'] = len(map_obj.get_root().render().encode('utf-8'))
+
+    return {
+        'towns': n_towns,
+        'months': n_months,
+        'sheets': len(sheet_infos),
+        'workbooks': len(dataset['population_files']),
+        'html_bytes': html_bytes,
+        'stages': stages,
+    }
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', 'HEAD'], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def _print_case(result: dict) -> None:
+    print(f"\n町丁目数 {result['towns']} / 月数 {result['months']}")
+    for stage, stats in result['stages'].items():
+        print(f"  {stage:<26} median {stats['median_ms']:10.2f} ms"
+              f"  (min {stats['min_ms']:.2f} / max {stats['max_ms']:.2f})")
+    for lod, size in result['html_bytes'].items():
+        print(f"  html_bytes_{lod:<16} {size / 1024:10.1f} KB")
+
+def main(argv: Optional[List[str]] = None) -> Path:
+    parser = argparse.ArgumentParser(description='各段階の処理時間を計測する')
+    parser.add_argument('--towns', type=int, nargs='+', default=[100, 1000])
+    parser.add_argument('--months', type=int, nargs='+', default=[12, 60])
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--output', type=Path, default=None,
+                        help='結果のJSONファイル（省略時はbenchmarks/results/に保存）')
+    args = parser.parse_args(argv)
+
+    # Streamlitの実行環境外で呼ばれることによる警告を抑える
+    logging.getLogger('streamlit').setLevel(logging.ERROR)
+    # タイルのAPIキーに関する警告は計測に関係ないため表示しない
+    warnings.filterwarnings('ignore', category=UserWarning, module='folium')
+
+    results = []
+    original_files = dict(POPULATION_DATA_FILES)
+    original_topojson = DataPaths.TOPOJSON_PATH
+    try:
+        for n_towns in args.towns:
+            for n_months in args.months:
+                with tempfile.TemporaryDirectory() as tmp:
+                    result = run_case(n_towns, n_months, args.repeat, Path(tmp))
+                _print_case(result)
+                results.append(result)
+    finally:
+        POPULATION_DATA_FILES.clear()
+        POPULATION_DATA_FILES.update(original_files)
+        DataPaths.TOPOJSON_PATH = original_topojson
+
+    started_at = datetime.now()
+    report = {
+        'meta': {
+            'timestamp': started_at.isoformat(timespec='seconds'),
+            'git_commit': _git_commit(),
+            'python': sys.version.split()[0],
+            'platform': platform.platform(),
+            'repeat': args.repeat,
+        },
+        'results': results,
+    }
+
+    output = args.output or RESULTS_DIR / f'{started_at:%Y%m%d-%H%M%S}.json'
+    output.parent.mkdir(parents=True, exist_ok=True)
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    print(f'\n結果を保存しました: {output}')
+    return output
+
+if __name__ == '__main__':
+    main()
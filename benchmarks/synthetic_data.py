@@ -0,0 +1,196 @@
+"""ベンチマーク用の合成データ（人口ワークブックとTopoJSON）を生成する
+
+実データと同じシートのレイアウト（R6.3.1までの旧フォーマットと新フォーマット）で、
+町丁目数と月数を自由に増やしたデータを作る
+"""
+import argparse
+import json
+import math
+from pathlib import Path
+from typing import Dict, List
+
+import numpy as np
+import openpyxl
+
+from utils.constants import CENTER_LAT, CENTER_LON
+
+# 1つのワークブックに入れる月数（実データと同じく1年分）
+MONTHS_PER_WORKBOOK = 12
+
+# 最初の月（カタログに含まれる最も古い月）
+FIRST_YEAR, FIRST_MONTH = 4, 4
+
+# 1つの町丁目の大きさ（度）と、境界の1辺あたりの頂点数
+CELL_SIZE = 0.002
+POINTS_PER_EDGE = 12
+
+# 住所の丁目に使う数字（Excelは全角数字、TopoJSONは漢数字）
+ZENKAKU_DIGITS = '１２３４５６７８９'
+KANJI_DIGITS = '一二三四五六七八九'
+
+def town_names(n_towns: int) -> List[tuple[str, str]]:
+    """(Excel上の住所, TopoJSON上のS_NAME)の組を作る"""
+    names = []
+    for i in range(n_towns):
+        base = f'合成{i // 9:04d}町'
+        chome = i % 9
+        names.append((
+            f'{base}{ZENKAKU_DIGITS[chome]}丁目',
+            f'{base}{KANJI_DIGITS[chome]}丁目'
+        ))
+    return names
+
+def month_sequence(n_months: int) -> List[tuple[int, int]]:
+    """R4.4から始まる(令和の年, 月)の並びを作る"""
+    months = []
+    year, month = FIRST_YEAR, FIRST_MONTH
+    for _ in range(n_months):
+        months.append((year, month))
+        month += 1
+        if month > 12:
+            year, month = year + 1, 1
+    return months
+
+def _is_old_format(year: int, month: int) -> bool:
+    """R6.3.1までは旧フォーマット（B列が空の列）"""
+    return year < 6 or (year == 6 and month <= 3)
+
+def _write_sheet(
+    workbook: openpyxl.Workbook,
+    sheet_name: str,
+    old_format: bool,
+    addresses: List[str],
+    counts: np.ndarray
+) -> None:
+    """実データと同じレイアウトで1か月分のシートを書き込む"""
+    sheet = workbook.create_sheet(sheet_name)
+    padding = '　' * 8 + ' ' * 20
+    spacer = [None] if old_format else []
+
+    # 1行目: タイトル、2行目: ヘッダー、3行目: 小計の見出し
+    sheet.append([f'東京都調布市{padding}'] + spacer + [None, None, None, '1日現在'])
+    sheet.append(['住所      '] + spacer + ['男', '女', '人口数', '世帯数'])
+    sheet.append([None] + spacer + ['計　'] * 4)
+
+    for address, (male, female, households) in zip(addresses, counts):
+        sheet.append(
+            [f'{address}{padding}'] + spacer
+            + [int(male), int(female), int(male + female), int(households)]
+        )
+
+    # 最終行: 合計
+    totals = counts.sum(axis=0)
+    sheet.append(
+        [f'合　　計{padding}'] + spacer
+        + [int(totals[0]), int(totals[1]), int(totals[0] + totals[1]), int(totals[2])]
+    )
+
+def write_population_workbooks(
+    out_dir: Path,
+    n_towns: int,
+    n_months: int,
+    seed: int = 0
+) -> Dict[str, str]:
+    """合成の人口ワークブックを書き込み、ファイル識別子 → パスの辞書を返す"""
+    rng = np.random.default_rng(seed)
+    addresses = [address for address, _ in town_names(n_towns)]
+    months = month_sequence(n_months)
+
+    # 町丁目ごとの基準人口から、月ごとに少しずつ変化させる
+    base = rng.integers(200, 4000, size=n_towns)
+    files = {}
+    for start in range(0, n_months, MONTHS_PER_WORKBOOK):
+        key = f'W{start // MONTHS_PER_WORKBOOK:03d}'
+        workbook = openpyxl.Workbook(write_only=True)
+        for year, month in months[start:start + MONTHS_PER_WORKBOOK]:
+            population = np.maximum(base + rng.integers(-30, 31, size=n_towns), 0)
+            male = population // 2
+            female = population - male
+            households = np.maximum(population // 2, 0)
+            counts = np.stack([male, female, households], axis=1)
+            _write_sheet(
+                workbook, f'R{year}.{month}.1', _is_old_format(year, month),
+                addresses, counts
+            )
+        path = out_dir / f'synthetic_{key}.xlsx'
+        workbook.save(path)
+        files[key] = str(path)
+    return files
+
+def _cell_ring(x0: float, y0: float) -> List[List[float]]:
+    """1つの町丁目（正方形）の外周を、各辺に頂点を入れたリングにする"""
+    corners = [
+        (x0, y0), (x0 + CELL_SIZE, y0), (x0 + CELL_SIZE, y0 + CELL_SIZE),
+        (x0, y0 + CELL_SIZE)
+    ]
+    ring = []
+    for (ax, ay), (bx, by) in zip(corners, corners[1:] + corners[:1]):
+        for k in range(POINTS_PER_EDGE):
+            t = k / POINTS_PER_EDGE
+            ring.append([round(ax + (bx - ax) * t, 7), round(ay + (by - ay) * t, 7)])
+    ring.append(ring[0])
+    return ring
+
+def write_topojson(out_dir: Path, n_towns: int) -> str:
+    """町丁目を格子状に並べたTopoJSON（townレイヤー）を書き込む"""
+    columns = math.ceil(math.sqrt(n_towns))
+    origin_x = CENTER_LON - columns * CELL_SIZE / 2
+    origin_y = CENTER_LAT - columns * CELL_SIZE / 2
+
+    arcs = []
+    geometries = []
+    for i, (_, s_name) in enumerate(town_names(n_towns)):
+        row, col = divmod(i, columns)
+        arcs.append(_cell_ring(origin_x + col * CELL_SIZE, origin_y + row * CELL_SIZE))
+        geometries.append({
+            'type': 'Polygon',
+            'arcs': [[i]],
+            'properties': {
+                'KEY_CODE': f'99999{i:06d}',
+                'PREF_NAME': '東京都',
+                'CITY_NAME': '調布市',
+                'S_NAME': s_name,
+            },
+        })
+
+    topology = {
+        'type': 'Topology',
+        'objects': {'town': {'type': 'GeometryCollection', 'geometries': geometries}},
+        'arcs': arcs,
+    }
+    path = out_dir / 'synthetic_town.topojson'
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(topology, f, ensure_ascii=False)
+    return str(path)
+
+def generate_dataset(
+    out_dir: Path,
+    n_towns: int,
+    n_months: int,
+    seed: int = 0
+) -> dict:
+    """合成データ一式を生成する
+
+    Returns:
+        dict: population_files（ファイル識別子 → パス）とtopojson（パス）
+    """
+    out_dir = Path(out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    return {
+        'population_files': write_population_workbooks(out_dir, n_towns, n_months, seed),
+        'topojson': write_topojson(out_dir, n_towns),
+    }
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description='ベンチマーク用の合成データを生成する')
+    parser.add_argument('out_dir', type=Path)
+    parser.add_argument('--towns', type=int, default=100)
+    parser.add_argument('--months', type=int, default=12)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    dataset = generate_dataset(args.out_dir, args.towns, args.months, args.seed)
+    print(json.dumps(dataset, ensure_ascii=False, indent=2))
+
+if __name__ == '__main__':
+    main()
@@ -1,63 +1,115 @@
 import streamlit as st
-import pandas as pd
-from datetime import datetime
 
-from utils.data_loader import (
-    load_data, load_school_data, get_all_sheet_names,
-    ColumnNames
+from core.data_loader import get_all_sheet_names, ColumnNames
+from core.exceptions import ChofuDataError
+from utils.constants import SCHOOL_DATA_PATH, CENTER_LAT, CENTER_LON
+from utils.map_components import (
+    create_base_map, create_layer_group, add_center_label,
+    add_population_layer, add_month_slider_layer, add_facility_markers,
+    add_station_marker, add_area_labels
 )
-from utils.constants import (
-    POPULATION_DATA_FILES, SCHOOL_DATA_PATH,
-    CENTER_LAT, CENTER_LON, STATIONS
+from core.geometry_registry import (
+    apply_geometry_lod, get_label_points, lod_for_zoom
 )
-from utils.map_components import (
-    create_base_map, add_center_label, add_choropleth,
-    add_tooltips, add_school_markers, add_station_marker, add_area_labels
+from utils.cached_loaders import (
+    load_cached_data, load_cached_history, load_cached_school_points,
+    load_cached_totals
+)
+from utils.ui_components import (
+    display_metrics, display_debug_panel, display_data_error,
+    display_sheet_catalog_errors, is_debug_mode
 )
-from utils.ui_components import display_metrics
-from streamlit_folium import st_folium
+from core import profiling
+from utils.warmup import prefetch_adjacent_months
+from utils.map_render_cache import (
+    RenderedMap, get_rendered_map, render_map, show_rendered_map
+)
+
+# 地図コンポーネントのキー（固定にして、再実行で地図を作り直さない）
+MAP_KEY = 'main_map'
+
+# 地図の初期ズームレベル
+DEFAULT_ZOOM = 14
 
 # セッションステートの初期化
 if 'map_data' not in st.session_state:
     st.session_state.map_data = None
-if 'last_update' not in st.session_state:
-    st.session_state.last_update = datetime.now().isoformat()
-
-# ページが再読み込みされたときにタイムスタンプを更新
-if st.session_state.get('page_reloaded', True):
-    st.session_state.last_update = datetime.now().isoformat()
-    st.session_state.page_reloaded = False
-
-@st.cache_data(ttl=3600)
-def load_cached_data(sheet_info):
-    """データを読み込んでキャッシュする"""
-    return load_data(sheet_info)
-
-@st.cache_data(ttl=3600)
-def load_cached_school_data(file_path, school_type):
-    """学校データを読み込んでキャッシュする"""
-    return load_school_data(file_path, school_type)
-
-@st.cache_data(ttl=3600)
-def get_previous_year_data(selected_sheet, sheet_names):
-    """1年前のデータを取得"""
-    try:
-        # 現在の年月を取得
-        current_year = int(selected_sheet.split(':')[1][1:].split('.')[0])  # "R6" から "6" を取得
-        current_month = int(selected_sheet.split(':')[1].split('.')[1])    # "12.1" から "12" を取得
-        
-        # 1年前のシート情報を探す
-        for display_name, sheet_info in sheet_names:
-            year = int(sheet_info.split(':')[1][1:].split('.')[0])
-            month = int(sheet_info.split(':')[1].split('.')[1])
-            if year == current_year - 1 and month == current_month:
-                return load_cached_data(sheet_info)
-    except:
-        pass
-    return None
+
+def _build_map(
+    selected_sheet: str,
+    use_month_slider: bool,
+    lod: int,
+    school_types: tuple,
+    show_station: bool
+) -> RenderedMap:
+    """表示設定に応じた地図を組み立て、st_foliumに渡す形に描画する
+
+    結果は全セッションで共有し、バックグラウンドのスレッドでも作り直されるため、
+    ここでは画面に表示せず、メッセージはRenderedMapに入れてrun()で表示する
+    """
+    # データの読み込み
+    with profiling.cache_call('load_cached_data'):
+        merged_df = load_cached_data(selected_sheet)
+    with profiling.span('apply_geometry_lod'):
+        map_df = apply_geometry_lod(merged_df, lod)
+
+    # 地図の土台（常に同じ内容のため、ブラウザ側の地図は作り直されない）
+    map = create_base_map(CENTER_LAT, CENTER_LON, DEFAULT_ZOOM)
+    add_center_label(map, CENTER_LAT, CENTER_LON, '佐須町二丁目')
+    add_area_labels(map, get_label_points())
+
+    # 年月や表示設定で変わるレイヤーは、既存の地図に差分として送る
+    population_group = create_layer_group('population')
+    if use_month_slider:
+        with profiling.cache_call('load_cached_history'):
+            history = load_cached_history()
+        add_month_slider_layer(
+            population_group,
+            map_df,
+            history.towns,
+            history.labels,
+            history.masked(ColumnNames.POPULATION),
+            history.month_index(selected_sheet)
+        )
+    else:
+        add_population_layer(population_group, map_df, ["住所", "人口数"])
+    marker_group = create_layer_group('markers')
+    warnings = []
+    errors = []
+
+    # 学校マーカーの追加（ファイルは1回だけ読み込み、表示する種別で絞り込む）
+    if school_types:
+        try:
+            with profiling.cache_call('load_cached_school_points'):
+                school_points = load_cached_school_points(SCHOOL_DATA_PATH)
+            if school_points.attrs.get('incomplete_rows'):
+                warnings.append('一部の学校データに欠損値が含まれています')
+            add_facility_markers(
+                marker_group,
+                school_points[school_points[ColumnNames.FACILITY_TYPE].isin(school_types)]
+            )
+        except Exception as e:
+            errors.append(f'学校データの読み込みに失敗しました: {str(e)}')
+
+    # 駅マーカーの追加
+    if show_station:
+        try:
+            add_station_marker(marker_group)
+        except Exception as e:
+            errors.append(f'駅データの読み込みに失敗しました: {str(e)}')
+
+    with profiling.span('render_map'):
+        rendered = render_map(map, [population_group, marker_group])
+    rendered.warnings = warnings
+    rendered.errors = errors
+    rendered.complete = not errors
+    return rendered
 
 def run():
     """人口ヒートマップページを表示する"""
+    # 再実行ごとの計測（無効の場合はほぼ処理を増やさない）
+    profiling.start_trace('heatmap', is_debug_mode())
+
     st.markdown("""
     # 調布市の人口ヒートマップ
 
@@ -71,6 +123,7 @@ def run():
         # 年代選択
         with st.expander('📅 年代の選択', expanded=True):
             sheet_names = get_all_sheet_names()
+            display_sheet_catalog_errors()
             display_names, sheet_infos = zip(*sheet_names)
             
             selected_display = st.selectbox(
@@ -81,6 +134,14 @@ def run():
             )
             # 表示用の名前から実際のシート情報を取得
             selected_sheet = sheet_infos[display_names.index(selected_display)]
+
+            # 全ての年月を一度に送り、地図上のスライダーで切り替えるモード
+            use_month_slider = st.checkbox(
+                '地図上のスライダーで年月を切り替える 🎞️',
+                value=False,
+                help='全ての年月の人口を一度に読み込み、ブラウザ内で塗り分けを切り替えます',
+                key='month_slider'
+            )
         
         # 学校表示設定
         with st.expander('🏫 学校の表示設定', expanded=True):
@@ -108,53 +169,65 @@ def run():
     
     # データの読み込みと表示
     try:
-
-        # データの読み込み
-        merged_df = load_cached_data(selected_sheet)
-        previous_df = get_previous_year_data(selected_sheet, sheet_names)
+        with profiling.cache_call('load_cached_totals'):
+            totals = load_cached_totals()
         
-        # メトリクスの表示
-        display_metrics(merged_df, previous_df)
+        # メトリクスの表示（比較する月の境界データは読み込まない）
+        with profiling.span('display_metrics'):
+            year_month = totals.year_month(selected_sheet)
+            if year_month is None:
+                # 合計を集計できなかった年月でも地図は表示する
+                st.warning('この年月の市全体の合計はありません')
+            else:
+                year, month = year_month
+                display_metrics(
+                    totals.get(year, month),
+                    totals.delta(year, month, 12),
+                    totals.delta(year, month, 1)
+                )
+
+        # 前回のズームレベルに応じて境界の詳細度を選ぶ
+        map_state = st.session_state.get(MAP_KEY) or {}
+        lod = lod_for_zoom(map_state.get('zoom', DEFAULT_ZOOM))
+
+        # 表示する学校の種別
+        school_types = tuple(
+            school_type for school_type, show in (
+                ('小学校', show_elementary_schools),
+                ('中学校', show_junior_high_schools),
+            ) if show
+        )
 
-        # 地図の作成と表示
-        map = create_base_map(CENTER_LAT, CENTER_LON)
-        
-        # 地図コンポーネントの追加
-        add_center_label(map, CENTER_LAT, CENTER_LON, '佐須町二丁目')
-        add_choropleth(map, merged_df, ["住所", "人口数"])
-        add_tooltips(map, merged_df)
-        add_area_labels(map, merged_df)
-
-        # 学校マーカーの追加
-        if show_elementary_schools:
-            try:
-                elementary_df = load_cached_school_data(SCHOOL_DATA_PATH, '小学校')
-                add_school_markers(map, elementary_df, 'red')
-            except Exception as e:
-                st.error(f'小学校データの読み込みに失敗しました: {str(e)}')
-
-        if show_junior_high_schools:
-            try:
-                junior_high_df = load_cached_school_data(SCHOOL_DATA_PATH, '中学校')
-                add_school_markers(map, junior_high_df, 'blue')
-            except Exception as e:
-                st.error(f'中学校データの読み込みに失敗しました: {str(e)}')
-
-        # 駅マーカーの追加
-        if show_station:
-            try:
-                add_station_marker(map)
-            except Exception as e:
-                st.error(f'駅データの読み込みに失敗しました: {str(e)}')
-
-        # 地図の表示
-        st_folium(
-            map,
-            use_container_width=True,
-            height=800,
-            key=f'main_map_{selected_sheet}_{st.session_state.last_update}'
+        # 地図の内容は表示設定の組み合わせで決まるため、描画済みのものがあれば再利用する
+        rendered = get_rendered_map(
+            (selected_sheet, use_month_slider, lod, school_types, show_station),
+            lambda: _build_map(
+                selected_sheet, use_month_slider, lod, school_types, show_station
+            )
         )
 
+        # 地図の組み立てで発生したメッセージは、キャッシュから取得した場合も毎回表示する
+        for message in rendered.warnings:
+            st.warning(message)
+        for message in rendered.errors:
+            st.error(message)
+
+        # 次に選ばれやすい前月・翌月・1年前をバックグラウンドで先読み
+        if not use_month_slider:
+            prefetch_adjacent_months(selected_sheet)
+
+        # 地図の表示（パン・ズームの位置は地図側で保たれる）
+        with profiling.span('st_folium'):
+            show_rendered_map(
+                rendered,
+                key=MAP_KEY,
+                height=800,
+                # 詳細度の切り替えに必要なズームの変化だけで再実行する
+                returned_objects=['zoom']
+            )
+
+    except ChofuDataError as e:
+        display_data_error(e)
     except Exception as e:
         st.error(f'データの表示に失敗しました: {str(e)}')
         st.write('エラーの詳細:', str(e))
@@ -168,3 +241,8 @@ def run():
     * [市立小・中学校に関するデータ](https://www.city.chofu.lg.jp/100010/p054122.html)より市立小・中学校一覧をダウンロード
     * [国勢調査町丁・字等別境界データセット](https://geoshape.ex.nii.ac.jp/ka/resource/)より調布市のTopoJSONファイルをダウンロード
     """)
+
+    # 計測結果の表示（?debug=1 または環境変数で有効な場合のみ）
+    trace = profiling.finish_trace()
+    if trace is not None:
+        display_debug_panel(trace)
@@ -1,50 +1,139 @@
+import math
+
 import streamlit as st
-import pandas as pd
 import plotly.graph_objects as go
-from datetime import datetime
 
-from utils.data_loader import (
-    load_data, get_all_sheet_names,
-    ColumnNames
+from core.population_history import TOTAL_AREA, downsample_months
+from utils.cached_loaders import load_cached_history
+from utils.ui_components import (
+    display_debug_panel, display_data_error, display_sheet_catalog_errors, is_debug_mode
 )
+from core import profiling
+from core.exceptions import ChofuDataError
 
-@st.cache_data(ttl=3600, show_spinner=False)
-def get_population_history():
-    """令和4年4月から最新までの人口データを取得"""
-    history_data = []
-    sheet_names = get_all_sheet_names()
-    
-    for display_name, sheet_info in sheet_names:
-        year = int(sheet_info.split(':')[1][1:].split('.')[0])
-        month = int(sheet_info.split(':')[1].split('.')[1])
-        
-        # R4.4.1以降のデータのみを使用
-        if year < 4 or (year == 4 and month < 4):
-            continue
-            
-        df = load_data(sheet_info)
-        
-        # 各地域の人口データを取得
-        for _, row in df.iterrows():
-            if not pd.isna(row[ColumnNames.POPULATION]) and not pd.isna(row['S_NAME']):
-                history_data.append({
-                    '年月': f'令和{year}年{month}月',
-                    '地域': row['S_NAME'],
-                    '人口': row[ColumnNames.POPULATION]
-                })
-        
-        # 全人口のデータを追加
-        total = df[ColumnNames.POPULATION].sum()
-        history_data.append({
-            '年月': f'令和{year}年{month}月',
-            '地域': '全人口',
-            '人口': total
-        })
-    
-    return pd.DataFrame(history_data)
+# これより多くの系列を描くときはWebGL（Scattergl）で描画する
+WEBGL_TRACE_THRESHOLD = 10
+
+# 月の軸の点数の上限（超える場合はサーバー側で間引く）
+MAX_MONTH_POINTS = 240
+
+# 小さな複数グラフの列数と1行あたりの高さ
+SMALL_MULTIPLE_COLUMNS = 5
+SMALL_MULTIPLE_ROW_HEIGHT = 160
+
+# 月の軸の日付の表示形式（d3-time-format）
+MONTH_FORMAT = '%Y年%-m月'
+
+HOVER_TEMPLATE = '%{x}<br>%{y:,}人<extra></extra>'
+
+def _line_or_bar_figure(history, areas, month_index, months, graph_type):
+    """選択した地域の系列を1つのグラフに重ねる"""
+    # 系列が多い場合はSVGではなくWebGLで描画する
+    use_webgl = len(areas) > WEBGL_TRACE_THRESHOLD
+    scatter = go.Scattergl if use_webgl else go.Scatter
+
+    traces = []
+    for area in areas:
+        population = history.series(area)[month_index]
+        if graph_type == '線グラフ':
+            traces.append(scatter(
+                x=months,
+                y=population,
+                name=area,
+                mode='lines' if use_webgl else 'lines+markers',
+                hovertemplate=HOVER_TEMPLATE
+            ))
+        else:  # 棒グラフ
+            traces.append(go.Bar(
+                x=months,
+                y=population,
+                name=area,
+                hovertemplate=HOVER_TEMPLATE
+            ))
+
+    fig = go.Figure(data=traces)
+    fig.update_layout(
+        height=600,
+        # 系列が多いと全系列の一覧表示が重くなるため、最も近い系列だけを表示
+        hovermode='closest' if use_webgl else 'x unified'
+    )
+    return fig
+
+def _small_multiples_figure(history, areas, month_index, months):
+    """地域ごとに小さなグラフを並べる
+
+    make_subplotsは系列ごとに検証が走り遅いため、レイアウトのgridで配置する
+    """
+    rows = math.ceil(len(areas) / SMALL_MULTIPLE_COLUMNS)
+    traces = []
+    annotations = []
+    axes = {}
+    for i, area in enumerate(areas):
+        suffix = '' if i == 0 else str(i + 1)
+        traces.append(go.Scattergl(
+            x=months,
+            y=history.series(area)[month_index],
+            name=area,
+            mode='lines',
+            showlegend=False,
+            xaxis=f'x{suffix}',
+            yaxis=f'y{suffix}',
+            hovertemplate=HOVER_TEMPLATE
+        ))
+        # 各グラフの上に地域名を表示
+        annotations.append(dict(
+            text=area,
+            xref=f'x{suffix} domain',
+            yref=f'y{suffix} domain',
+            x=0.5,
+            y=1.0,
+            xanchor='center',
+            yanchor='bottom',
+            showarrow=False,
+            font=dict(size=11)
+        ))
+        # 月の軸は全グラフで共有し、目盛りは最下段だけに表示
+        axes[f'xaxis{suffix}'] = dict(
+            matches='x' if i > 0 else None,
+            showticklabels=i >= len(areas) - SMALL_MULTIPLE_COLUMNS
+        )
+        axes[f'yaxis{suffix}'] = dict(tickformat=',d')
+
+    fig = go.Figure(data=traces)
+    fig.update_layout(
+        grid=dict(
+            rows=rows,
+            columns=SMALL_MULTIPLE_COLUMNS,
+            pattern='independent',
+            ygap=0.4
+        ),
+        annotations=annotations,
+        height=max(rows * SMALL_MULTIPLE_ROW_HEIGHT, 300),
+        **axes
+    )
+    return fig
+
+def _heatmap_figure(history, areas, month_index, months):
+    """地域 × 年月のヒートマップを1つの系列で描く"""
+    fig = go.Figure(go.Heatmap(
+        z=[history.series(area)[month_index] for area in areas],
+        x=months,
+        y=areas,
+        colorscale='YlOrRd',
+        colorbar=dict(title='人口数', tickformat=',d'),
+        hovertemplate='%{y}<br>%{x}<br>%{z:,}人<extra></extra>'
+    ))
+    fig.update_layout(
+        height=max(len(areas) * 14 + 200, 400),
+        yaxis=dict(autorange='reversed')
+    )
+    return fig
 
 def run():
     """人口推移グラフページを表示する"""
+    # 再実行ごとの計測（無効の場合はほぼ処理を増やさない）
+    profiling.start_trace('time_series', is_debug_mode())
+
     st.markdown("""
     # 調布市の人口推移グラフ
 
@@ -54,7 +143,13 @@ def run():
     # プログレスバーを表示してデータ読み込みを視覚化
     with st.spinner('データを読み込んでいます...'):
         # 時系列データの取得
-        history_df = get_population_history()
+        try:
+            with profiling.cache_call('load_cached_history'):
+                history = load_cached_history()
+        except ChofuDataError as e:
+            display_data_error(e)
+            raise e
+    display_sheet_catalog_errors()
 
     # サイドバーの設定
     with st.sidebar:
@@ -63,22 +158,31 @@ def run():
         # 地域選択の設定
         with st.expander('📍 地域の選択', expanded=True):
             # 利用可能な地域のリストを取得（全人口を先頭に）
-            available_areas = ['全人口'] + sorted(
-                [area for area in history_df['地域'].unique() if area != '全人口']
-            )
+            available_areas = [TOTAL_AREA] + sorted(history.towns)
             
+            # 全ての町丁目を一度に表示するモード
+            show_all_towns = st.checkbox(
+                '全ての町丁目を表示',
+                value=False,
+                help='全ての町丁目の推移を表示します（小さな複数グラフやヒートマップ向け）',
+                key='all_towns'
+            )
+
             # デフォルトで全人口を選択
             selected_areas = st.multiselect(
                 '表示する地域を選択',
                 available_areas,
-                default=['全人口']
+                default=[TOTAL_AREA],
+                disabled=show_all_towns
             )
+            if show_all_towns:
+                selected_areas = sorted(history.towns)
         
         # グラフタイプの選択
         with st.expander('📈 グラフの種類', expanded=True):
             graph_type = st.radio(
                 'グラフの種類を選択',
-                ['線グラフ', '棒グラフ'],
+                ['線グラフ', '棒グラフ', '小さな複数グラフ', 'ヒートマップ'],
                 horizontal=True
             )
         
@@ -97,70 +201,64 @@ def run():
                     y_min = st.number_input('最小値', value=0, step=1000)
                 with col2:
                     # 初期最大値を全人口の最大値に設定
-                    default_max = int(history_df[history_df['地域'] == '全人口']['人口'].max())
+                    default_max = int(history.series(TOTAL_AREA).max())
                     y_max = st.number_input('最大値', value=default_max, step=1000)
 
     if selected_areas:
+        # 月の軸は全地域で共通（古い順に並んでいる）。長すぎる場合は間引く
+        # 日付の軸にするため、データのない月があっても実際の間隔で表示される
+        month_index = downsample_months(len(history.months), MAX_MONTH_POINTS)
+        months = history.months[month_index]
+        if len(month_index) < len(history.months):
+            st.caption(
+                f'{len(history.months)}か月分のうち{len(month_index)}か月分を等間隔に表示しています'
+            )
+
         # 選択された地域のデータでグラフを作成
-        fig = go.Figure()
+        with profiling.span('build_figure'):
+            if graph_type == '小さな複数グラフ':
+                fig = _small_multiples_figure(history, selected_areas, month_index, months)
+            elif graph_type == 'ヒートマップ':
+                fig = _heatmap_figure(history, selected_areas, month_index, months)
+            else:
+                fig = _line_or_bar_figure(
+                    history, selected_areas, month_index, months, graph_type
+                )
         
-        for area in selected_areas:
-            # データのコピーを作成
-            area_data = history_df[history_df['地域'] == area].copy()
-            
-            # 年月を日付型に変換してソート
-            def convert_to_date(x):
-                # 令和から数字を抽出
-                year = int(x.replace('令和', '').split('年')[0])
-                # 月を抽出
-                month = int(x.split('年')[1].replace('月', ''))
-                # 令和を西暦に変換（令和1年 = 2019年）
-                year = year + 2018
-                return pd.to_datetime(f'{year}-{month:02d}-01')
-                
-            area_data.loc[:, 'date'] = area_data['年月'].apply(convert_to_date)
-            area_data = area_data.sort_values('date')
-            
-            if graph_type == '線グラフ':
-                fig.add_trace(go.Scatter(
-                    x=area_data['年月'],
-                    y=area_data['人口'],
-                    name=area,
-                    mode='lines+markers',
-                    hovertemplate='%{x}<br>%{y:,}人<extra></extra>'
-                ))
-            else:  # 棒グラフ
-                fig.add_trace(go.Bar(
-                    x=area_data['年月'],
-                    y=area_data['人口'],
-                    name=area,
-                    hovertemplate='%{x}<br>%{y:,}人<extra></extra>'
-                ))
-        
-        # グラフのレイアウト設定
-        fig.update_layout(
-            title='人口推移',
-            xaxis_title='年月',
-            yaxis_title='人口数',
-            height=600,
-            hovermode='x unified',
-            yaxis=dict(
-                title='人口数',
-                tickformat=',d',
-                range=[y_min, y_max] if y_scale == '固定' else None,
-                autorange=True if y_scale == '自動' else False
-            ),
-            showlegend=True,
-            legend=dict(
-                yanchor="top",
-                y=0.99,
-                xanchor="left",
-                x=0.01
+        # グラフのレイアウト設定（月の軸の目盛りとホバーは年月で表示）
+        fig.update_xaxes(tickformat=MONTH_FORMAT, hoverformat=MONTH_FORMAT)
+        if graph_type == 'ヒートマップ':
+            fig.update_layout(title='人口推移', xaxis_title='年月')
+            if y_scale == '固定':
+                # 色の範囲を固定する
+                fig.update_traces(zmin=y_min, zmax=y_max)
+        elif graph_type == '小さな複数グラフ':
+            fig.update_layout(title='人口推移')
+            if y_scale == '固定':
+                fig.update_yaxes(range=[y_min, y_max], autorange=False)
+        else:
+            fig.update_layout(
+                title='人口推移',
+                xaxis_title='年月',
+                yaxis_title='人口数',
+                yaxis=dict(
+                    title='人口数',
+                    tickformat=',d',
+                    range=[y_min, y_max] if y_scale == '固定' else None,
+                    autorange=True if y_scale == '自動' else False
+                ),
+                showlegend=True,
+                legend=dict(
+                    yanchor="top",
+                    y=0.99,
+                    xanchor="left",
+                    x=0.01
+                )
             )
-        )
         
         # グラフの表示
-        st.plotly_chart(fig, use_container_width=True)
+        with profiling.span('plotly_chart'):
+            st.plotly_chart(fig, use_container_width=True)
     else:
         st.warning('地域を選択してください')
 
@@ -171,3 +269,8 @@ def run():
 
     * [調布市の世帯と人口に関するデータ](https://www.city.chofu.lg.jp/030040/p017111.html)より調布市の町別の人口データをダウンロード
     """)
+
+    # 計測結果の表示（?debug=1 または環境変数で有効な場合のみ）
+    trace = profiling.finish_trace()
+    if trace is not None:
+        display_debug_panel(trace)
@@ -0,0 +1,5 @@
+"""人口データの読み込み・集計を行うパッケージ
+
+Streamlitに依存しないため、バッチ処理やノートブックからも利用できる。
+読み込みに失敗した場合はcore.exceptionsの例外を送出し、表示は呼び出し側で行う
+"""
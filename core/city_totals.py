@@ -0,0 +1,92 @@
+from typing import Dict, Optional
+
+import pandas as pd
+
+from core.data_loader import ColumnNames, resolve_sheet_info
+from core.population_store import load_population_store
+from core.sheet_catalog import get_sheet_catalog
+
+# 市全体の合計を集計する指標
+TOTAL_METRICS = [
+    ColumnNames.POPULATION,
+    ColumnNames.HOUSEHOLDS,
+    ColumnNames.MALE,
+    ColumnNames.FEMALE,
+]
+
+class CityTotals:
+    """月ごとの市全体の合計（人口数・世帯数・男・女）の集計表
+
+    シートの町丁目の行をそのまま合計するため、Excelの合計行と一致する
+    （境界データで複数のポリゴンに分かれた町丁目を重複して数えない）
+    """
+
+    def __init__(self, table: pd.DataFrame):
+        # (年, 月)をインデックスとし、sheet_infoと各指標の列を持つ表
+        self.table = table
+        self._rows: Dict[tuple[int, int], Dict[str, float]] = {
+            key: {metric: float(row[metric]) for metric in TOTAL_METRICS}
+            for key, row in table.iterrows()
+        }
+        self._by_info = {
+            sheet_info: key for key, sheet_info in table['sheet_info'].items()
+        }
+
+    @property
+    def nbytes(self) -> int:
+        return int(self.table.memory_usage(index=True, deep=True).sum())
+
+    def get(self, year: int, month: int) -> Optional[Dict[str, float]]:
+        """年月の合計を取得する（データがない場合はNone）"""
+        return self._rows.get((year, month))
+
+    def year_month(self, sheet_info: str) -> Optional[tuple[int, int]]:
+        """シート情報に対応する(年, 月)を返す"""
+        return self._by_info.get(sheet_info)
+
+    def months_before(
+        self,
+        year: int,
+        month: int,
+        months: int
+    ) -> Optional[Dict[str, float]]:
+        """指定した月数だけ前の合計を取得する（1年前なら12、前月なら1）"""
+        index = year * 12 + (month - 1) - months
+        return self.get(index // 12, index % 12 + 1)
+
+    def delta(
+        self,
+        year: int,
+        month: int,
+        months: int
+    ) -> Optional[Dict[str, float]]:
+        """指定した月数だけ前からの増減を返す（比較できない場合はNone）"""
+        current = self.get(year, month)
+        previous = self.months_before(year, month, months)
+        if current is None or previous is None:
+            return None
+        return {metric: current[metric] - previous[metric] for metric in TOTAL_METRICS}
+
+def build_city_totals() -> CityTotals:
+    """カラムナーストアから全ての年月の市全体の合計を集計する"""
+    sheets = load_population_store()
+
+    records = []
+    for entry in get_sheet_catalog().entries:
+        df = sheets.get(resolve_sheet_info(entry.sheet_info))
+        if df is None:
+            continue
+        totals = df[TOTAL_METRICS].sum()
+        records.append({
+            'year': entry.year,
+            'month': entry.month,
+            'sheet_info': entry.sheet_info,
+            **{metric: totals[metric] for metric in TOTAL_METRICS},
+        })
+
+    table = pd.DataFrame(
+        records, columns=['year', 'month', 'sheet_info'] + TOTAL_METRICS
+    )
+    # 同じ年月が複数ある場合はカタログで先に並んでいる方を使う
+    table = table.drop_duplicates(subset=['year', 'month'])
+    return CityTotals(table.set_index(['year', 'month']).sort_index())
@@ -0,0 +1,19 @@
+import os
+from pathlib import Path
+
+# データファイルのパスを更新
+POPULATION_DATA_FILES = {
+    'R6': 'data/choufushi_open_data_chouchoubetu1201.xlsx',  # 令和6年のデータ
+    'R5': 'data/choufushi_open_data_r5chouchoubetu.xlsx',    # 令和5年のデータ
+    'R4': 'data/choufushi_open_data_r4chouchoubetu.xlsx',    # 令和4年のデータ
+    'R3': 'data/choufushi_open_data_r3chouchoubetu.xlsx'     # 令和3年のデータを追加
+}
+SCHOOL_DATA_PATH = Path('data/choufushi_open_data_school.xls')
+
+# 前処理済みデータ（カラムナーストアなど）の保存先
+CACHE_DIR = Path('.cache')
+
+# プロセス全体で共有するデータフレームのキャッシュの上限（MB）と有効期限（秒）
+# 有効期限を過ぎた値はすぐには捨てず、返しながらバックグラウンドで読み込み直す
+FRAME_CACHE_MAX_BYTES = int(os.environ.get('CHOFU_FRAME_CACHE_MB', '256')) * 1024 * 1024
+FRAME_CACHE_TTL = 3600
@@ -0,0 +1,513 @@
+import numpy as np
+import pandas as pd
+import hashlib
+import json
+import logging
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from pathlib import Path
+from typing import TYPE_CHECKING, Union, List, Dict, Optional, Iterator
+from core.constants import POPULATION_DATA_FILES, SCHOOL_DATA_PATH
+from core import profiling
+from core.exceptions import (
+    ChofuDataError, DataFileNotFoundError, SchoolDataError, SheetParseError
+)
+from core.town_index import get_town_index, normalize_town_names, report_unmatched
+
+# geopandasは重いため型注釈でのみ参照する（人口推移ページでは読み込まない）
+if TYPE_CHECKING:
+    import geopandas as gpd
+
+logger = logging.getLogger(__name__)
+
+# 定数定義
+class DataPaths:
+    """データファイルのパスを管理するクラス"""
+    TOPOJSON_PATH: str = 'data/r2ka13208.topojson'  # GeoJSONからTopoJSONに変更
+
+# 人口・世帯数のデータ型（欠損値は<NA>で表す32ビット整数）
+COUNT_DTYPE = 'Int32'
+
+class ColumnNames:
+    """カラム名の定数を管理するクラス"""
+    ADDRESS = '住所'
+    MALE = '男'
+    FEMALE = '女'
+    POPULATION = '人口数'
+    HOUSEHOLDS = '世帯数'
+    SCHOOL_NAME = '学校名'
+    LATITUDE = '緯度'
+    LONGITUDE = '経度'
+    FACILITY_TYPE = '種別'
+
+# 学校の種別（学校名に含まれる語で判定し、どれにも当たらない場合はその他）
+SCHOOL_TYPES = ['小学校', '中学校']
+OTHER_FACILITY_TYPE = 'その他'
+
+def file_stamp(file_path: Union[str, Path]) -> tuple:
+    """ファイルのパス・更新時刻・サイズ（ファイルがない場合は更新時刻・サイズがNone）"""
+    try:
+        stat = os.stat(file_path)
+    except OSError:
+        return (str(file_path), None, None)
+    return (str(file_path), stat.st_mtime_ns, stat.st_size)
+
+def source_version() -> str:
+    """元データのファイル（人口・境界・学校）のバージョン
+
+    ファイルを読み込まずに更新時刻とサイズから作るため、キャッシュのキーに含めて
+    ファイルが更新されたときに古い読み込み結果を使わないようにできる
+    """
+    paths = [*POPULATION_DATA_FILES.values(), DataPaths.TOPOJSON_PATH, SCHOOL_DATA_PATH]
+    payload = json.dumps([file_stamp(path) for path in paths])
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()[:16]
+
+@profiling.timed()
+def load_data(sheet_info: str) -> 'gpd.GeoDataFrame':
+    """TopoJSONデータと人口データを読み込み、マージしたデータフレームを返す
+    
+    Args:
+        sheet_info: "年度:シート名" の形式の文字列（例: "R6:R6.12.1"）
+    """
+    # 循環インポートを避けるため関数内でインポート
+    from core.geometry_registry import get_town_geometry
+    from core.population_store import read_population_sheet
+
+    # ファイル識別子とシート名を分離
+    year, sheet_name = resolve_sheet_info(sheet_info)
+    
+    try:
+        # プロセス内で共有している町丁目の境界データを取得
+        with profiling.span('get_town_geometry'):
+            jp_geo_df = get_town_geometry()
+        
+        # カラムナーストアから調布市の町別の人口データを読み込み
+        with profiling.span('read_population_sheet'):
+            chofu_df = read_population_sheet(year, sheet_name)
+
+        return _attach_population(jp_geo_df, chofu_df)
+        
+    except ChofuDataError:
+        raise
+    except Exception as e:
+        raise ChofuDataError(f'データの読み込みに失敗しました: {str(e)}') from e
+
+@profiling.timed('merge')
+def _attach_population(
+    geo_df: 'gpd.GeoDataFrame',
+    chofu_df: pd.DataFrame
+) -> 'gpd.GeoDataFrame':
+    """共有している境界データに1か月分の人口データを追加する
+
+    住所とS_NAMEを町丁目IDに変換し、整数のIDで結合する
+    （pd.merge(how='left')と同様に、先に出現した住所を優先）
+    """
+    town_index = get_town_index()
+    report_unmatched(chofu_df[ColumnNames.ADDRESS])
+
+    # 境界データの各行に対応する人口データの行番号（データがない場合は-1）
+    positions = town_index.positions(chofu_df[ColumnNames.ADDRESS])
+    geo_ids = town_index.ids(geo_df['S_NAME'])
+    rows = np.where(geo_ids >= 0, positions[geo_ids], -1)
+    profiling.count('merge.towns_without_data', int((rows < 0).sum()))
+    aligned_df = chofu_df.reset_index(drop=True).reindex(rows)
+
+    # 境界データは共有したまま、月ごとの属性カラムだけを追加
+    # （.arrayで代入し、住所は全ての月で共有しているカテゴリ型のまま保つ）
+    merged_df = geo_df.copy(deep=False)
+    for col in aligned_df.columns:
+        merged_df[col] = aligned_df[col].array
+    # 境界データから引き継いだカラムはメモリ使用量の見積もりで数えない
+    merged_df.attrs['shared_columns'] = list(geo_df.columns)
+    
+    # 欠損値を0で埋め、欠損のなくなった人口・世帯数は通常の32ビット整数にする
+    numeric_columns = [ColumnNames.MALE, ColumnNames.FEMALE, ColumnNames.POPULATION, ColumnNames.HOUSEHOLDS]
+    merged_df[numeric_columns] = merged_df[numeric_columns].fillna(0).astype('int32')
+    
+    return merged_df
+
+def resolve_sheet_info(sheet_info: str) -> tuple[str, str]:
+    """"年度:シート名" をファイル識別子と実際のシート名に分解する
+
+    Args:
+        sheet_info: "年度:シート名" の形式の文字列（例: "R6:R6.12.1"）
+    """
+    year, sheet_name = sheet_info.split(':')
+    
+    # R4ファイルのR3.5.1シートをR4.5.1として扱う
+    if year == 'R4' and sheet_name == 'R4.5.1':
+        sheet_name = 'R3.5.1'
+    
+    return year, sheet_name
+
+@profiling.timed('read_excel')
+def read_choufu_population_excel_sheet(
+    file_path: Union[str, Path],
+    sheet_name: Union[str, int] = 0
+) -> pd.DataFrame:
+    """調布市の町別の人口データを読み込む"""
+    # シート名から古いフォーマットかどうかを判定
+    is_old_format = _is_old_format(sheet_name)
+    
+    try:
+        if is_old_format:
+            # 古いフォーマット: 必要な列のみを明示的に指定
+            # B列（インデックス1）を除外し、A列とC列以降を使用
+            df = pd.read_excel(
+                file_path,
+                header=1,
+                sheet_name=sheet_name,
+                usecols=[0, 2, 3, 4, 5]  # A列とC列以降を使用
+            )
+            # 最初の列を住所列として設定し、NULLを削除してからインデックスに設定
+            df = df.rename(columns={df.columns[0]: ColumnNames.ADDRESS})
+            df = df[df[ColumnNames.ADDRESS].notna()]  # NULLの行を削除
+            df = df.set_index(ColumnNames.ADDRESS)
+        else:
+            # 新しいフォーマット: 従来通り
+            df = pd.read_excel(
+                file_path,
+                header=1,
+                index_col=0,
+                usecols=[0, 1, 2, 3, 4],
+                sheet_name=sheet_name
+            )
+
+        # データのクリーニング以降は変更なし
+        df = _clean_dataframe(df)
+        df = _convert_numeric_columns(df)
+        df = _convert_address_numbers(df)
+        
+        return df
+        
+    except Exception as e:
+        raise SheetParseError(file_path, sheet_name, is_old_format, e) from e
+
+def _is_old_format(sheet_name: Union[str, int]) -> bool:
+    """シート名から古いフォーマット（B列が余分にある形式）かどうかを判定"""
+    if not isinstance(sheet_name, str):
+        return False
+    try:
+        year = int(sheet_name[1:].split('.')[0])  # "R3" から "3" を取得
+        month = int(sheet_name.split('.')[1])     # "3.1" から "3" を取得
+    except:
+        return False
+    # R6.3.1までは古いフォーマット
+    return year < 6 or (year == 6 and month <= 3)
+
+def list_sheet_names(file_path: Union[str, Path]) -> List[str]:
+    """ワークブックのシート名だけを取得する（セルの内容は読み込まない）"""
+    # openpyxlはストアやカタログを作り直すときだけ必要なため関数内でインポート
+    import openpyxl
+
+    workbook = openpyxl.load_workbook(file_path, read_only=True)
+    try:
+        return workbook.sheetnames
+    finally:
+        workbook.close()
+
+def iter_workbook_sheets(
+    file_path: Union[str, Path],
+    sheet_names: Optional[List[str]] = None
+) -> Iterator[tuple[str, pd.DataFrame]]:
+    """ワークブックを一度だけ開き、シートごとにクリーニング済みの人口データを返す
+
+    openpyxlの読み取り専用モードで行をストリーミングで読み込むため、
+    シートごとにファイルを開き直したり共有文字列を解析し直したりしない
+
+    Args:
+        file_path: ワークブックのパス
+        sheet_names: 読み込むシート名のリスト（省略時は全シート）
+
+    Yields:
+        tuple[str, pd.DataFrame]: (シート名, 人口データ)
+    """
+    import openpyxl
+
+    workbook = openpyxl.load_workbook(file_path, read_only=True, data_only=True)
+    try:
+        targets = workbook.sheetnames if sheet_names is None else sheet_names
+        for sheet_name in targets:
+            is_old_format = _is_old_format(sheet_name)
+            try:
+                with profiling.span('parse_sheet'):
+                    rows = workbook[sheet_name].iter_rows(
+                        min_row=2,  # 1行目はタイトルのため2行目のヘッダーから
+                        max_col=6,
+                        values_only=True
+                    )
+                    df = _rows_to_frame(rows, is_old_format)
+                    df = _clean_dataframe(df)
+                    df = _convert_numeric_columns(df)
+                    df = _convert_address_numbers(df)
+            except Exception as e:
+                raise SheetParseError(file_path, sheet_name, is_old_format, e) from e
+            yield sheet_name, df
+    finally:
+        workbook.close()
+
+def _rows_to_frame(rows: Iterator[tuple], is_old_format: bool) -> pd.DataFrame:
+    """シートの行（2行目のヘッダー以降）を住所をインデックスとしたデータフレームにする
+
+    read_choufu_population_excel_sheetと同じ列の選び方をする
+    """
+    # 古いフォーマットはB列を除外し、A列とC列以降を使用
+    usecols = [0, 2, 3, 4, 5] if is_old_format else [0, 1, 2, 3, 4]
+
+    header = next(rows, None)
+    if header is None:
+        raise ValueError('ヘッダー行が見つかりません')
+    header = tuple(header) + (None,) * (6 - len(header))
+    columns = [
+        str(header[i]) if header[i] is not None else f'Unnamed: {i}'
+        for i in usecols
+    ]
+
+    records = []
+    for row in rows:
+        row = tuple(row) + (None,) * (6 - len(row))
+        values = [row[i] for i in usecols]
+        # 完全に空の行は読み飛ばす（pd.read_excelと同様）
+        if all(v is None for v in values):
+            continue
+        records.append(values)
+
+    df = pd.DataFrame(records, columns=columns)
+    if is_old_format:
+        # 最初の列を住所列として設定し、NULLを削除してからインデックスに設定
+        df = df.rename(columns={df.columns[0]: ColumnNames.ADDRESS})
+        df = df[df[ColumnNames.ADDRESS].notna()]  # NULLの行を削除
+    return df.set_index(df.columns[0])
+
+def parse_sheets(
+    sheet_infos: List[str],
+    max_workers: Optional[int] = None
+) -> List[pd.DataFrame]:
+    """複数シートをワークブックごとにまとめ、プロセスプールで並列に読み込む
+
+    各ワークブックは1つのワーカーで一度だけ開かれる
+
+    Args:
+        sheet_infos: "年度:シート名" の形式の文字列のリスト
+        max_workers: ワーカー数（省略時はワークブック数とCPU数の小さい方）
+
+    Returns:
+        List[pd.DataFrame]: sheet_infosと同じ順序の人口データ
+    """
+    # ワークブックごとにシートをまとめる（元の位置も記録しておく）
+    groups: Dict[str, List[tuple[int, str]]] = {}
+    for position, sheet_info in enumerate(sheet_infos):
+        year, sheet_name = resolve_sheet_info(sheet_info)
+        groups.setdefault(year, []).append((position, sheet_name))
+
+    if not groups:
+        return []
+
+    tasks = [
+        (POPULATION_DATA_FILES[year], [name for _, name in items])
+        for year, items in groups.items()
+    ]
+    workers = max_workers or min(len(tasks), os.cpu_count() or 1)
+
+    if workers > 1 and len(tasks) > 1:
+        try:
+            # Streamlitのサーバーや事前読み込みのスレッドから呼ばれるため、
+            # スレッドを持つプロセスをforkせずspawnでワーカーを起動する
+            with ProcessPoolExecutor(
+                max_workers=workers, mp_context=multiprocessing.get_context('spawn')
+            ) as executor:
+                results = list(executor.map(_parse_workbook_sheets, *zip(*tasks)))
+        except (OSError, BrokenProcessPool):
+            # プロセスを作れない環境では逐次処理にフォールバック
+            results = [_parse_workbook_sheets(*task) for task in tasks]
+    else:
+        results = [_parse_workbook_sheets(*task) for task in tasks]
+
+    # 入力と同じ順序に並べ直す
+    ordered: List[Optional[pd.DataFrame]] = [None] * len(sheet_infos)
+    for items, frames in zip(groups.values(), results):
+        for (position, _), df in zip(items, frames):
+            ordered[position] = df
+    return ordered
+
+def _parse_workbook_sheets(
+    file_path: Union[str, Path],
+    sheet_names: List[str]
+) -> List[pd.DataFrame]:
+    """1つのワークブックを一度だけ開き、指定されたシートを読み込む"""
+    frames = dict(iter_workbook_sheets(file_path, sheet_names))
+    return [frames[sheet_name] for sheet_name in sheet_names]
+
+def _clean_dataframe(df: pd.DataFrame) -> pd.DataFrame:
+    """データフレームの基本的なクリーニングを行う"""
+    # 空白の削除
+    df.columns = df.columns.str.strip()
+    df.index = df.index.str.strip()
+    
+    # 無効なデータの削除
+    df = df[~df.index.isnull()]
+    df = df.iloc[:-1]  # 合計行の削除
+    
+    # インデックスをカラムに変換
+    df = df.reset_index()
+    
+    # カラム名の設定
+    df.columns = [
+        ColumnNames.ADDRESS,
+        ColumnNames.MALE,
+        ColumnNames.FEMALE,
+        ColumnNames.POPULATION,
+        ColumnNames.HOUSEHOLDS
+    ]
+    
+    return df
+
+def _convert_numeric_columns(df: pd.DataFrame) -> pd.DataFrame:
+    """数値カラムを欠損値を扱える32ビット整数に変換
+
+    数値に変換できないセルは<NA>になる（float64のNaNにはしない）
+    """
+    numeric_columns = [
+        ColumnNames.MALE,
+        ColumnNames.FEMALE,
+        ColumnNames.POPULATION,
+        ColumnNames.HOUSEHOLDS
+    ]
+    
+    for col in numeric_columns:
+        df[col] = pd.to_numeric(df[col], errors='coerce').round().astype(COUNT_DTYPE)
+    
+    return df
+
+def _convert_address_numbers(df: pd.DataFrame) -> pd.DataFrame:
+    """住所の数字を漢数字に変換し、空白を取り除く（境界データのS_NAMEと同じ表記にする）"""
+    df[ColumnNames.ADDRESS] = normalize_town_names(df[ColumnNames.ADDRESS])
+    return df
+
+def convert_to_readable_date(sheet_name: str) -> str:
+    """シート名を読みやすい形式に変換（例：R6.12.1 → 令和6年12月）"""
+    try:
+        if not sheet_name.startswith('R'):
+            return sheet_name
+        
+        # R6.12.1 形式を分解
+        year = sheet_name[1:].split('.')[0]
+        month = sheet_name.split('.')[1]
+        
+        # 全角数字を半角数字に変換するマッピング
+        zen_to_han = str.maketrans('０１２３４５６７８９', '0123456789')
+        month = month.translate(zen_to_han)
+        
+        return f'令和{year}年{month}月'
+    except:
+        return sheet_name
+
+@profiling.timed()
+def get_all_sheet_names() -> List[tuple[str, str]]:
+    """全ての利用可能なシート名を取得する
+    
+    ワークブックが更新されない限り、キャッシュ済みのシートカタログを使う。
+    読み込めなかったワークブックは含まれない（get_sheet_catalog().errorsで確認できる）
+    
+    Returns:
+        List[tuple[str, str]]: (表示用シート名, 実際のシート名とファイルの組み合わせ)のリスト
+    """
+    # 循環インポートを避けるため関数内でインポート
+    from core.sheet_catalog import get_sheet_catalog
+    
+    catalog = get_sheet_catalog()
+    
+    # 年月の降順に並んだ(表示用シート名, "ファイル識別子:シート名")のリスト
+    return catalog.as_tuples()
+
+@profiling.timed()
+def load_school_points(file_path: Union[str, Path]) -> pd.DataFrame:
+    """学校データを読み込み、地図に表示する位置の表にする
+
+    ファイルは種別によらず1回だけ読み込み、種別での絞り込みはメモリ上で行う
+
+    Returns:
+        pd.DataFrame: 学校名（文字列）・種別（カテゴリ）・緯度・経度（float64）の表。
+            位置がわからない学校は地図に表示できないため含まない。
+            欠損値を含んでいた行数をattrs['incomplete_rows']に持つ
+    """
+    if not Path(file_path).exists():
+        raise DataFileNotFoundError(f'ファイルが見つかりません: {file_path}')
+    
+    # データの読み込みと前処理
+    df = _load_and_process_school_data(file_path)
+    
+    # 欠損値のチェック
+    incomplete_rows = _check_school_data_missing_values(df)
+
+    names = df[ColumnNames.SCHOOL_NAME].astype('string')
+    school_types = np.select(
+        [names.str.contains(school_type, regex=False, na=False) for school_type in SCHOOL_TYPES],
+        SCHOOL_TYPES,
+        default=OTHER_FACILITY_TYPE
+    )
+    points = pd.DataFrame({
+        ColumnNames.SCHOOL_NAME: names,
+        ColumnNames.FACILITY_TYPE: pd.Categorical(
+            school_types, categories=SCHOOL_TYPES + [OTHER_FACILITY_TYPE]
+        ),
+        ColumnNames.LATITUDE: df[ColumnNames.LATITUDE].astype('float64'),
+        ColumnNames.LONGITUDE: df[ColumnNames.LONGITUDE].astype('float64'),
+    })
+    points = points.dropna(
+        subset=[ColumnNames.LATITUDE, ColumnNames.LONGITUDE]
+    ).reset_index(drop=True)
+    points.attrs['incomplete_rows'] = incomplete_rows
+    return points
+
+def _load_and_process_school_data(file_path: str) -> pd.DataFrame:
+    """学校データの読み込みと前処理を行う"""
+    df = pd.read_excel(file_path, sheet_name='Sheet1')
+    
+    # カラム名の変換
+    column_mapping = {
+        '名称': ColumnNames.SCHOOL_NAME,
+        '緯度（10進法）': ColumnNames.LATITUDE,
+        '経度（10進法）': ColumnNames.LONGITUDE,
+    }
+    
+    for old_col, new_col in column_mapping.items():
+        if old_col in df.columns:
+            df = df.rename(columns={old_col: new_col})
+    
+    # カラムの存在確認
+    required_columns = [
+        ColumnNames.SCHOOL_NAME,
+        ColumnNames.LATITUDE,
+        ColumnNames.LONGITUDE
+    ]
+    _validate_required_columns(df, required_columns)
+    
+    # 緯度経度を数値型に変換
+    df[ColumnNames.LATITUDE] = pd.to_numeric(df[ColumnNames.LATITUDE], errors='coerce')
+    df[ColumnNames.LONGITUDE] = pd.to_numeric(df[ColumnNames.LONGITUDE], errors='coerce')
+    
+    return df
+
+def _validate_required_columns(df: pd.DataFrame, required_columns: List[str]) -> None:
+    """必要なカラムが存在するか確認"""
+    missing_columns = [col for col in required_columns if col not in df.columns]
+    if missing_columns:
+        raise SchoolDataError(
+            f'必要なカラムが不足しています: {", ".join(missing_columns)}\n'
+            f'利用可能なカラム: {", ".join(df.columns)}'
+        )
+
+def _check_school_data_missing_values(df: pd.DataFrame) -> int:
+    """学校データの欠損値をチェックし、欠損値を含む行数を返す"""
+    check_columns = [
+        ColumnNames.SCHOOL_NAME,
+        ColumnNames.LATITUDE,
+        ColumnNames.LONGITUDE
+    ]
+    incomplete_rows = int(df[check_columns].isna().any(axis=1).sum())
+    if incomplete_rows:
+        logger.warning('一部の学校データに欠損値が含まれています（%d行）', incomplete_rows)
+    return incomplete_rows
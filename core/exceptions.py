@@ -0,0 +1,38 @@
+"""coreパッケージが送出する例外
+
+画面への表示は呼び出し側（ページ）で行うため、coreでは例外に必要な情報を持たせて送出する
+"""
+from pathlib import Path
+from typing import Union
+
+class ChofuDataError(Exception):
+    """データの読み込み・集計に失敗したことを表す例外の基底クラス"""
+
+class DataFileNotFoundError(ChofuDataError, FileNotFoundError):
+    """データファイル（人口・境界・学校）が見つからない"""
+
+class SheetParseError(ChofuDataError):
+    """人口データのシートを読み込めない"""
+
+    def __init__(
+        self,
+        file_path: Union[str, Path],
+        sheet_name: Union[str, int],
+        is_old_format: bool,
+        error: Exception
+    ):
+        self.file_path = file_path
+        self.sheet_name = sheet_name
+        self.is_old_format = is_old_format
+        super().__init__(f'データの読み込みに失敗しました: {error}')
+
+    @property
+    def detail(self) -> str:
+        """どのファイルのどのシートで失敗したか"""
+        return (
+            f'ファイル: {self.file_path}, シート: {self.sheet_name}, '
+            f'フォーマット: {"旧" if self.is_old_format else "新"}'
+        )
+
+class SchoolDataError(ChofuDataError, ValueError):
+    """学校データの形式が想定と異なる（必要なカラムがないなど）"""
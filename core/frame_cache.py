@@ -0,0 +1,269 @@
+import logging
+import sys
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from functools import wraps
+from typing import Callable, Dict, Hashable, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from core.constants import FRAME_CACHE_MAX_BYTES, FRAME_CACHE_TTL
+
+# キャッシュにないことを表す値（Noneもキャッシュできるようにする）
+_MISSING = object()
+
+logger = logging.getLogger(__name__)
+
+def frame_nbytes(df: pd.DataFrame) -> int:
+    """データフレームのメモリ使用量（バイト）を見積もる
+
+    カテゴリ型の列は全ての月でカテゴリの集合を共有しているため、コードの分だけ数える。
+    境界データと共有しているカラム（attrsのshared_columns）は境界データ側で数えるため含めない
+    """
+    shared_columns = set(df.attrs.get('shared_columns', ()))
+    nbytes = int(df.index.memory_usage(deep=True))
+    for name, column in df.items():
+        if name in shared_columns:
+            continue
+        if isinstance(column.dtype, pd.CategoricalDtype):
+            nbytes += int(column.cat.codes.nbytes)
+        else:
+            nbytes += int(column.memory_usage(index=False, deep=True))
+    return nbytes
+
+def estimate_nbytes(value) -> int:
+    """キャッシュする値のおおよそのメモリ使用量（バイト）を見積もる"""
+    if isinstance(value, pd.DataFrame):
+        return frame_nbytes(value)
+    if isinstance(value, (pd.Series, pd.Index)):
+        return int(value.memory_usage(deep=True))
+    if isinstance(value, np.ndarray):
+        return int(value.nbytes)
+    nbytes = getattr(value, 'nbytes', None)
+    if isinstance(nbytes, int):
+        return nbytes
+    return sys.getsizeof(value)
+
+class _Flight:
+    """読み込み中の1つのキーの状態（同じキーの他の呼び出し側はこれを待つ）"""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.value = _MISSING
+        self.error: Optional[BaseException] = None
+
+class FrameCache:
+    """プロセス全体で共有する、メモリ使用量に上限のあるLRUキャッシュ
+
+    st.cache_dataと違い、ヒットしたときに値を複製せず同じオブジェクトを返す。
+    全てのセッションで共有されるため、返された値は呼び出し側で変更しないこと
+
+    同じキーの読み込みは同時に1つだけ行い、他の呼び出し側はその結果を待つ。
+    有効期限を過ぎた値は捨てずに返し、バックグラウンドで読み込み直す
+    """
+
+    def __init__(self, max_bytes: int, ttl: Optional[float] = None):
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        # キー → (値, バイト数, 保存した時刻)。末尾ほど最近使われたもの
+        self._entries: OrderedDict = OrderedDict()
+        self._total_bytes = 0
+        self._lock = threading.Lock()
+        # 読み込み中のキー → 読み込みの状態
+        self._flights: Dict[Hashable, _Flight] = {}
+        # 期限切れの値の読み込み直しは1スレッドで順番に行う
+        self._refresh_executor = ThreadPoolExecutor(
+            max_workers=1, thread_name_prefix='revalidate'
+        )
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+        self._waits = 0
+        self._stale_hits = 0
+        self._refreshes = 0
+
+    def get(self, key: Hashable, default=None):
+        """キャッシュから値を取得する（ない・期限切れの場合はdefault）
+
+        期限切れの値は削除しない（get_or_loadで返しながら読み込み直す）
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or self._expired(entry):
+                self._misses += 1
+                return default
+            self._entries.move_to_end(key)
+            self._hits += 1
+            return entry[0]
+
+    def contains(self, key: Hashable) -> bool:
+        """有効な値があるか（ヒット・ミスの回数や使用順には影響しない）"""
+        with self._lock:
+            entry = self._entries.get(key)
+            return entry is not None and not self._expired(entry)
+
+    def put(self, key: Hashable, value, nbytes: Optional[int] = None) -> None:
+        """値を保存し、上限を超えた分を古いものから破棄する
+
+        1つで上限を超える値は保存しない
+        """
+        nbytes = estimate_nbytes(value) if nbytes is None else nbytes
+        if nbytes > self.max_bytes:
+            return
+
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (value, nbytes, time.monotonic())
+            self._total_bytes += nbytes
+            while self._total_bytes > self.max_bytes:
+                oldest_key = next(iter(self._entries))
+                self._remove(oldest_key)
+                self._evictions += 1
+
+    def get_or_load(
+        self,
+        key: Hashable,
+        loader: Callable[[], object],
+        cacheable: Optional[Callable[[object], bool]] = None
+    ):
+        """キャッシュにあればそれを返し、なければ読み込んで保存する
+
+        - 他の呼び出し側が同じキーを読み込み中の場合は、その結果を待って返す
+        - 期限切れの値はそのまま返し、バックグラウンドで1回だけ読み込み直す
+        - cacheableがFalseを返した値は保存しない（待っていた呼び出し側には返す。
+          期限切れの値の読み込み直しでは、古い値を使い続ける）
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self._hits += 1
+                if self._expired(entry):
+                    self._stale_hits += 1
+                    if key not in self._flights:
+                        flight = self._flights[key] = _Flight()
+                        self._refreshes += 1
+                        self._refresh_executor.submit(
+                            self._revalidate, key, loader, flight, cacheable
+                        )
+                return entry[0]
+
+            self._misses += 1
+            flight = self._flights.get(key)
+            is_leader = flight is None
+            if is_leader:
+                flight = self._flights[key] = _Flight()
+            else:
+                self._waits += 1
+
+        # 読み込み中はロックを持たない（他のキーの取得を妨げない）
+        if is_leader:
+            self._load(key, loader, flight, cacheable)
+        else:
+            flight.done.wait()
+
+        if flight.error is not None:
+            raise flight.error
+        return flight.value
+
+    def _load(
+        self,
+        key: Hashable,
+        loader: Callable[[], object],
+        flight: _Flight,
+        cacheable: Optional[Callable[[object], bool]] = None
+    ) -> None:
+        """値を読み込んで保存し、待っている呼び出し側に結果を知らせる"""
+        try:
+            flight.value = loader()
+            if cacheable is None or cacheable(flight.value):
+                self.put(key, flight.value)
+        except BaseException as e:
+            flight.error = e
+        finally:
+            with self._lock:
+                self._flights.pop(key, None)
+            flight.done.set()
+
+    def _revalidate(
+        self,
+        key: Hashable,
+        loader: Callable[[], object],
+        flight: _Flight,
+        cacheable: Optional[Callable[[object], bool]] = None
+    ) -> None:
+        """期限切れの値を読み込み直す（失敗した場合は古い値を使い続ける）"""
+        self._load(key, loader, flight, cacheable)
+        if flight.error is not None:
+            logger.error(
+                'キャッシュの読み込み直しに失敗しました: %s', key, exc_info=flight.error
+            )
+
+    def entry_sizes(self) -> List[tuple[Hashable, int]]:
+        """保存している値のキーとバイト数の一覧（古い順）"""
+        with self._lock:
+            return [(key, entry[1]) for key, entry in self._entries.items()]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._total_bytes = 0
+
+    def stats(self) -> Dict[str, int]:
+        """ヒット・ミス・破棄の回数と現在の使用量を返す"""
+        with self._lock:
+            return {
+                'hits': self._hits,
+                'misses': self._misses,
+                'evictions': self._evictions,
+                'waits': self._waits,
+                'stale_hits': self._stale_hits,
+                'refreshes': self._refreshes,
+                'entries': len(self._entries),
+                'bytes': self._total_bytes,
+                'max_bytes': self.max_bytes,
+            }
+
+    def _expired(self, entry: tuple) -> bool:
+        return self.ttl is not None and time.monotonic() - entry[2] > self.ttl
+
+    def _remove(self, key: Hashable) -> None:
+        _, nbytes, _ = self._entries.pop(key)
+        self._total_bytes -= nbytes
+
+# プロセス全体で1つだけ持つキャッシュ
+_frame_cache = FrameCache(FRAME_CACHE_MAX_BYTES, ttl=FRAME_CACHE_TTL)
+
+def get_frame_cache() -> FrameCache:
+    return _frame_cache
+
+def cache_frame(
+    func: Optional[Callable] = None,
+    *,
+    version: Optional[Callable[[], Hashable]] = None
+) -> Callable:
+    """関数の戻り値を共有キャッシュに保持するデコレーター
+
+    キーは関数名と引数（ハッシュ可能であること）から作る。versionを指定した場合は
+    呼び出しのたびにその戻り値もキーに含め、バージョンが変わると読み込み直す
+    （@cache_frame(version=source_version)のように使う）。
+    wrapper.is_cached(*args)でキャッシュ済みかどうかを確認できる
+    """
+    if func is None:
+        return lambda func: cache_frame(func, version=version)
+
+    def make_key(args: tuple) -> tuple:
+        if version is None:
+            return (func.__module__, func.__qualname__, args)
+        return (func.__module__, func.__qualname__, args, version())
+
+    @wraps(func)
+    def wrapper(*args):
+        return _frame_cache.get_or_load(make_key(args), lambda: func(*args))
+
+    wrapper.is_cached = lambda *args: _frame_cache.contains(make_key(args))
+    return wrapper
@@ -0,0 +1,240 @@
+import json
+import threading
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import geopandas as gpd
+import pandas as pd
+from shapely.geometry import LineString, MultiPolygon, Polygon
+
+from core.data_loader import ColumnNames, DataPaths, file_stamp
+from core.exceptions import DataFileNotFoundError
+from core.town_index import clear_town_index
+
+# 町丁目の境界データを読み込むレイヤー名
+TOWN_LAYER = 'town'
+
+# 詳細度（LOD）ごとの簡略化の許容誤差（度）と、そのLODを使う最小ズームレベル
+# ズーム14で1ピクセルは約8.6e-5度のため、半ピクセル程度の誤差に抑える
+LOD_LEVELS = [
+    {'min_zoom': 16, 'tolerance': 0.0},      # 拡大時は元の解像度
+    {'min_zoom': 15, 'tolerance': 0.00002},
+    {'min_zoom': 0, 'tolerance': 0.00004},   # 市全体を表示するズーム
+]
+
+# プロセス全体で共有する町丁目の境界データ（読み込み後は変更しない）
+_town_geometry: Optional[gpd.GeoDataFrame] = None
+_simplified_geometry: Dict[int, gpd.GeoSeries] = {}
+_label_points: Optional[pd.DataFrame] = None
+# TopoJSONに記録されていた座標系（Noneは世界測地系として扱う）
+_source_crs = None
+# 読み込んだときのTopoJSONのパス・更新時刻・サイズ（変わっていれば読み込み直す）
+_geometry_stamp: Optional[tuple] = None
+_lock = threading.Lock()
+
+def _read_town_geometry() -> tuple[gpd.GeoDataFrame, object]:
+    """TopoJSONから町丁目の境界データを読み込み、世界測地系に揃える
+
+    Returns:
+        tuple[gpd.GeoDataFrame, object]: (境界データ, TopoJSONの座標系)
+    """
+    # TopoJSONファイルの存在確認
+    if not Path(DataPaths.TOPOJSON_PATH).exists():
+        raise DataFileNotFoundError(f'TopoJSONファイルが見つかりません: {DataPaths.TOPOJSON_PATH}')
+
+    # TopoJSONファイルを直接GeoDataFrameとして読み込む
+    geo_df = gpd.read_file(DataPaths.TOPOJSON_PATH, layer=TOWN_LAYER)
+    source_crs = geo_df.crs
+
+    # CRSを明示的に設定（世界測地系）
+    if geo_df.crs is None:
+        geo_df = geo_df.set_crs('EPSG:4326')
+    elif geo_df.crs.to_epsg() != 4326:
+        geo_df = geo_df.to_crs('EPSG:4326')
+
+    return geo_df, source_crs
+
+def get_town_geometry() -> gpd.GeoDataFrame:
+    """町丁目の境界データを取得する
+
+    初回呼び出し時とTopoJSONが更新されたときだけデコード・座標変換し、以降は同じ
+    GeoDataFrameを返す。共有オブジェクトのため呼び出し側で変更しないこと
+    """
+    global _town_geometry, _source_crs, _geometry_stamp, _label_points
+
+    stamp = file_stamp(DataPaths.TOPOJSON_PATH)
+    if _town_geometry is None or _geometry_stamp != stamp:
+        with _lock:
+            # 他のスレッドが読み込み済みでないか再確認
+            if _town_geometry is None or _geometry_stamp != stamp:
+                # 古い境界データから作ったラベル位置と簡略化した境界も作り直す
+                _label_points = None
+                _simplified_geometry.clear()
+                _town_geometry, _source_crs = _read_town_geometry()
+                _geometry_stamp = stamp
+
+    return _town_geometry
+
+def clear_town_geometry() -> None:
+    """共有している境界データを破棄する（次回アクセス時に再読み込み）"""
+    global _town_geometry, _label_points, _geometry_stamp
+
+    with _lock:
+        _town_geometry = None
+        _geometry_stamp = None
+        _label_points = None
+        _simplified_geometry.clear()
+
+    # 町丁目IDも同じ境界データから作るため一緒に作り直す
+    clear_town_index()
+
+def get_label_points() -> pd.DataFrame:
+    """各町丁目のラベル位置（S_NAME・緯度・経度）を取得する
+
+    重心はポリゴンの外に出ることがあるため、必ず内部に入る代表点を使う。
+    境界データを読み込み直すまで計算結果を再利用する
+    """
+    global _label_points
+
+    # TopoJSONが更新されていればここで読み込み直し、ラベル位置も破棄される
+    geo_df = get_town_geometry()
+    label_points = _label_points
+    if label_points is None:
+        points = geo_df.geometry.representative_point()
+        label_points = pd.DataFrame({
+            'S_NAME': geo_df['S_NAME'].to_numpy(),
+            ColumnNames.LATITUDE: points.y.to_numpy(),
+            ColumnNames.LONGITUDE: points.x.to_numpy(),
+        })
+        with _lock:
+            # 計算中に境界データが読み込み直された場合は保持しない
+            if _label_points is None and geo_df is _town_geometry:
+                _label_points = label_points
+    return label_points
+
+def lod_for_zoom(zoom: Optional[float]) -> int:
+    """ズームレベルに応じたLODの番号を返す（0が最も詳細）"""
+    if zoom is None:
+        return len(LOD_LEVELS) - 1
+    for level, lod in enumerate(LOD_LEVELS):
+        if zoom >= lod['min_zoom']:
+            return level
+    return len(LOD_LEVELS) - 1
+
+def get_town_geometry_lod(level: int) -> gpd.GeoSeries:
+    """指定したLODの町丁目の境界（get_town_geometryと同じ行順）を取得する
+
+    TopoJSONのアーク（隣接する町丁目で共有される境界線）単位で簡略化するため、
+    隣り合うポリゴンの間に隙間や重なりができない。アークは世界測地系に変換してから
+    簡略化するため、許容誤差は度で指定し、元の解像度の境界と同じ座標系になる
+    """
+    geo_df = get_town_geometry()
+    tolerance = LOD_LEVELS[level]['tolerance']
+    if tolerance <= 0:
+        return geo_df.geometry
+
+    simplified = _simplified_geometry.get(level)
+    if simplified is None:
+        with _lock:
+            simplified = _simplified_geometry.get(level)
+            if simplified is None:
+                simplified = _simplify_town_geometry(
+                    geo_df.geometry, tolerance, _source_crs
+                )
+                # 境界データが読み込み直された後は古い境界から作った結果を保持しない
+                if geo_df is _town_geometry:
+                    _simplified_geometry[level] = simplified
+    return simplified
+
+def _decode_arcs(topology: dict) -> List[List[List[float]]]:
+    """TopoJSONのアークを座標のリストに変換する（量子化されていれば復元）"""
+    transform = topology.get('transform')
+    if transform is None:
+        return topology['arcs']
+
+    (scale_x, scale_y), (translate_x, translate_y) = (
+        transform['scale'], transform['translate']
+    )
+    arcs = []
+    for arc in topology['arcs']:
+        x = y = 0
+        points = []
+        # 量子化されたアークは前の点からの差分で記録されている
+        for dx, dy in arc:
+            x += dx
+            y += dy
+            points.append([x * scale_x + translate_x, y * scale_y + translate_y])
+        arcs.append(points)
+    return arcs
+
+def _to_wgs84(arcs: List[List[List[float]]], source_crs) -> List[List[List[float]]]:
+    """アークの座標を世界測地系（EPSG:4326）に変換する（get_town_geometryと同じ変換）"""
+    if source_crs is None or source_crs.to_epsg() == 4326:
+        return arcs
+
+    from pyproj import Transformer
+
+    transformer = Transformer.from_crs(source_crs, 'EPSG:4326', always_xy=True)
+    converted = []
+    for points in arcs:
+        xs, ys = transformer.transform(
+            [point[0] for point in points], [point[1] for point in points]
+        )
+        converted.append([[x, y] for x, y in zip(xs, ys)])
+    return converted
+
+def _build_ring(arc_indexes: List[int], arcs: List[list]) -> list:
+    """アーク番号の並びからリングの座標を組み立てる（負の番号は逆向き）"""
+    ring = []
+    for index in arc_indexes:
+        points = arcs[index] if index >= 0 else arcs[~index][::-1]
+        # つなぎ目の点が重複しないように2本目以降は先頭を除く
+        ring.extend(points if not ring else points[1:])
+    return ring
+
+def _build_polygon(polygon_arcs: List[List[int]], arcs: List[list]) -> Optional[Polygon]:
+    """リングごとのアーク番号からポリゴンを組み立てる（潰れたリングがあればNone）"""
+    rings = [_build_ring(ring, arcs) for ring in polygon_arcs]
+    if not all(len(ring) >= 4 for ring in rings):
+        return None
+    return Polygon(rings[0], rings[1:])
+
+def _simplify_town_geometry(
+    full_geometry: gpd.GeoSeries,
+    tolerance: float,
+    source_crs=None
+) -> gpd.GeoSeries:
+    """町丁目の境界をアーク単位で簡略化する"""
+    with open(DataPaths.TOPOJSON_PATH, encoding='utf-8') as f:
+        topology = json.load(f)
+
+    # 各アークを簡略化（端点は保持されるため隣接ポリゴンとの接続は保たれる）
+    simplified_arcs = []
+    for points in _to_wgs84(_decode_arcs(topology), source_crs):
+        if len(points) > 2:
+            line = LineString(points).simplify(tolerance, preserve_topology=True)
+            points = [list(coord) for coord in line.coords]
+        simplified_arcs.append(points)
+
+    geometries = []
+    objects = topology['objects'][TOWN_LAYER]['geometries']
+    for feature, original in zip(objects, full_geometry):
+        polygon = None
+        if feature['type'] == 'Polygon':
+            polygon = _build_polygon(feature['arcs'], simplified_arcs)
+        elif feature['type'] == 'MultiPolygon':
+            parts = [_build_polygon(part, simplified_arcs) for part in feature['arcs']]
+            if all(part is not None for part in parts):
+                polygon = MultiPolygon(parts)
+        # 潰れたリングができた場合や不正な形状になった場合は元の形状を使う
+        if polygon is None or not polygon.is_valid:
+            polygon = original
+        geometries.append(polygon)
+
+    return gpd.GeoSeries(geometries, index=full_geometry.index, crs=full_geometry.crs)
+
+def apply_geometry_lod(data: gpd.GeoDataFrame, level: int) -> gpd.GeoDataFrame:
+    """load_dataの結果の境界を指定したLODのものに差し替える（属性は共有）"""
+    lod_df = data.copy(deep=False)
+    lod_df[lod_df.geometry.name] = get_town_geometry_lod(level).values
+    return lod_df
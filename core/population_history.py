@@ -0,0 +1,134 @@
+from typing import Dict, List
+
+import numpy as np
+import pandas as pd
+
+from core.data_loader import ColumnNames, resolve_sheet_info
+from core.exceptions import ChofuDataError
+from core.population_store import load_population_store
+from core.sheet_catalog import SheetEntry, get_sheet_catalog
+from core.town_index import get_town_index, report_unmatched
+
+# 全人口（市全体の合計）を表す地域名
+TOTAL_AREA = '全人口'
+
+# 履歴として保持する指標
+METRICS = [
+    ColumnNames.POPULATION,
+    ColumnNames.HOUSEHOLDS,
+    ColumnNames.MALE,
+    ColumnNames.FEMALE,
+]
+
+class PopulationHistory:
+    """町丁目 × 月の人口履歴を指標ごとのNumPy配列で保持するクラス
+
+    各配列の形は (町丁目数, 月数) の32ビット整数で、月は古い順に並ぶ
+    """
+
+    def __init__(
+        self,
+        towns: List[str],
+        entries: List[SheetEntry],
+        values: Dict[str, np.ndarray],
+        observed: np.ndarray
+    ):
+        self.towns = towns
+        self.entries = entries
+        self.values = values
+        # 各月のシートにその町丁目の行があったか（ない場合の値は0）
+        self.observed = observed
+        self._town_index = {town: i for i, town in enumerate(towns)}
+
+        # 月の軸（令和1年 = 2019年）
+        self.months = pd.DatetimeIndex([
+            pd.Timestamp(year=entry.year + 2018, month=entry.month, day=1)
+            for entry in entries
+        ])
+        self.labels = [f'令和{entry.year}年{entry.month}月' for entry in entries]
+
+        # 市全体の合計をあらかじめ計算しておく
+        self.totals = {
+            metric: array.sum(axis=0) for metric, array in values.items()
+        }
+
+    @property
+    def nbytes(self) -> int:
+        """保持している配列のメモリ使用量（バイト）"""
+        return (
+            sum(array.nbytes for array in self.values.values())
+            + sum(array.nbytes for array in self.totals.values())
+            + self.observed.nbytes
+        )
+
+    def __contains__(self, area: str) -> bool:
+        return area == TOTAL_AREA or area in self._town_index
+
+    def series(
+        self,
+        area: str,
+        metric: str = ColumnNames.POPULATION
+    ) -> np.ndarray:
+        """地域の月ごとの値を取得する（全人口の場合は市全体の合計）"""
+        if area == TOTAL_AREA:
+            return self.totals[metric]
+        return self.values[metric][self._town_index[area]]
+
+    def month_index(self, sheet_info: str) -> int:
+        """シート情報に対応する月の列番号を返す（存在しない場合は最新の月）"""
+        for j, entry in enumerate(self.entries):
+            if entry.sheet_info == sheet_info:
+                return j
+        return len(self.entries) - 1
+
+    def masked(self, metric: str = ColumnNames.POPULATION) -> np.ndarray:
+        """シートに行がなかった町丁目・月をNaNにした値を返す"""
+        return np.where(self.observed, self.values[metric], np.nan)
+
+    def town_index(self, area: str) -> int:
+        """町丁目の行番号を返す（存在しない場合は-1）"""
+        return self._town_index.get(area, -1)
+
+def build_population_history() -> PopulationHistory:
+    """カラムナーストアから町丁目 × 月の人口履歴を作成する"""
+    # 町丁目の行は町丁目IDの順（複数のポリゴンに分かれている町丁目は1行）
+    town_index = get_town_index()
+    towns = town_index.towns
+    sheets = load_population_store()
+
+    # R4.4.1以降のデータを古い順に使用
+    entries = [
+        entry for entry in reversed(get_sheet_catalog().entries)
+        if entry.year > 4 or (entry.year == 4 and entry.month >= 4)
+    ]
+
+    values = {
+        metric: np.zeros((len(towns), len(entries)), dtype=np.int32)
+        for metric in METRICS
+    }
+    observed = np.zeros((len(towns), len(entries)), dtype=bool)
+    for j, entry in enumerate(entries):
+        key = resolve_sheet_info(entry.sheet_info)
+        if key not in sheets:
+            raise ChofuDataError(f'人口データのストアにシートがありません: {entry.sheet_info}')
+        df = sheets[key]
+        # 町丁目IDの並びに揃え、データのない町丁目は0とする
+        report_unmatched(df[ColumnNames.ADDRESS])
+        positions = town_index.positions(df[ColumnNames.ADDRESS])
+        observed[:, j] = positions >= 0
+        for metric in METRICS:
+            column = df[metric].fillna(0).to_numpy(dtype=np.int32)
+            values[metric][observed[:, j], j] = column[positions[observed[:, j]]]
+
+    return PopulationHistory(towns, entries, values, observed)
+
+def downsample_months(n_months: int, max_points: int) -> np.ndarray:
+    """月の軸をmax_points個以下に間引くときに残す列番号を返す
+
+    全ての地域で同じ月を残すため、系列ごとではなく等間隔に間引く。
+    最新の月は必ず残す
+    """
+    if n_months <= max_points:
+        return np.arange(n_months)
+    step = -(-n_months // max_points)  # 切り上げ
+    return np.arange(n_months - 1, -1, -step)[::-1]
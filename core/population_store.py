@@ -0,0 +1,222 @@
+import hashlib
+import json
+import threading
+from pathlib import Path
+from typing import Dict, Tuple
+
+import pandas as pd
+
+from core.constants import CACHE_DIR, POPULATION_DATA_FILES
+from core import profiling
+from core.data_loader import (
+    ColumnNames, get_all_sheet_names, parse_sheets, read_choufu_population_excel_sheet,
+    resolve_sheet_info
+)
+from core.sheet_catalog import get_sheet_catalog
+
+# カラムナーストアのファイル
+STORE_PATH = CACHE_DIR / 'population.parquet'
+MANIFEST_PATH = CACHE_DIR / 'population_manifest.json'
+
+# ストアの形式を変えたときに上げるバージョン
+STORE_VERSION = 3
+
+# ストア内でシートを識別するカラム
+FILE_KEY_COLUMN = '年度'
+SHEET_COLUMN = 'シート名'
+
+# プロセス内で読み込み済みのストア（フィンガープリントのキーと、作成時に
+# 読み込めなかったワークブックの組と一緒に保持）
+_loaded_store: Dict[str, object] = {'fingerprint': None, 'sheets': {}}
+_lock = threading.Lock()
+
+def _file_sha256(file_path: Path) -> str:
+    """ファイルのSHA-256ハッシュを計算する"""
+    digest = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def _read_manifest() -> dict:
+    """マニフェストを読み込む（存在しない・壊れている場合は空）"""
+    try:
+        with open(MANIFEST_PATH, encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+def _current_fingerprint(manifest: dict) -> Dict[str, dict]:
+    """各ワークブックのmtimeとハッシュからフィンガープリントを作成
+
+    mtimeとサイズがマニフェストと一致するファイルはハッシュの再計算を省略する。
+    見つからないワークブックはNoneとして記録する（シートカタログと同様に、
+    そのワークブックの月だけが欠け、他のワークブックの月は読み込める）
+    """
+    known = manifest.get('files', {})
+    fingerprint = {}
+    for year, file_path in POPULATION_DATA_FILES.items():
+        try:
+            stat = Path(file_path).stat()
+        except OSError:
+            fingerprint[year] = {
+                'path': str(file_path), 'mtime_ns': None, 'size': None, 'sha256': None,
+            }
+            continue
+        entry = known.get(year, {})
+        if (entry.get('path') == str(file_path)
+                and entry.get('mtime_ns') == stat.st_mtime_ns
+                and entry.get('size') == stat.st_size):
+            sha256 = entry['sha256']
+        else:
+            sha256 = _file_sha256(Path(file_path))
+        fingerprint[year] = {
+            'path': str(file_path),
+            'mtime_ns': stat.st_mtime_ns,
+            'size': stat.st_size,
+            'sha256': sha256,
+        }
+    return fingerprint
+
+def _fingerprint_key(fingerprint: Dict[str, dict]) -> str:
+    """ストアの内容を決めるキー（ハッシュのみで判定し、mtimeは含めない）"""
+    hashes = {year: entry['sha256'] for year, entry in fingerprint.items()}
+    payload = json.dumps(
+        {'version': STORE_VERSION, 'files': hashes}, sort_keys=True
+    )
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+def build_population_store() -> pd.DataFrame:
+    """全ワークブックの全シートを1つのカラムナーなデータフレームにまとめる
+
+    シートカタログに含まれるシートだけを読み込むため、カタログの作成で
+    読み込めなかったワークブックがある場合は一部のシートが欠けたストアになる
+    """
+    sheet_infos = [sheet_info for _, sheet_info in get_all_sheet_names()]
+
+    # ワークブックごとに並列で読み込む
+    frames = parse_sheets(sheet_infos)
+    for sheet_info, df in zip(sheet_infos, frames):
+        year, sheet_name = resolve_sheet_info(sheet_info)
+        df.insert(0, FILE_KEY_COLUMN, year)
+        df.insert(1, SHEET_COLUMN, sheet_name)
+
+    store_df = pd.concat(frames, ignore_index=True)
+
+    # 住所・年度・シート名は全ての月で同じカテゴリの集合を共有する
+    for column in (ColumnNames.ADDRESS, FILE_KEY_COLUMN, SHEET_COLUMN):
+        categories = sorted(store_df[column].dropna().unique())
+        store_df[column] = store_df[column].astype(pd.CategoricalDtype(categories))
+    return store_df
+
+def _write_store(store_df: pd.DataFrame, fingerprint: Dict[str, dict]) -> None:
+    """ストアとマニフェストをディスクに保存する"""
+    STORE_PATH.parent.mkdir(parents=True, exist_ok=True)
+    # 書き込み途中のファイルを読まれないように一時ファイルから置き換える
+    tmp_path = STORE_PATH.with_suffix('.parquet.tmp')
+    store_df.to_parquet(tmp_path, index=False)
+    tmp_path.replace(STORE_PATH)
+    _write_manifest(fingerprint)
+
+def _write_manifest(fingerprint: Dict[str, dict]) -> None:
+    """マニフェストを保存する"""
+    manifest = {
+        'version': STORE_VERSION,
+        'key': _fingerprint_key(fingerprint),
+        'files': fingerprint,
+    }
+    tmp_path = MANIFEST_PATH.with_suffix('.json.tmp')
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2)
+    tmp_path.replace(MANIFEST_PATH)
+
+def _split_by_sheet(store_df: pd.DataFrame) -> Dict[Tuple[str, str], pd.DataFrame]:
+    """ストアを(年度, シート名)ごとのデータフレームに分割する"""
+    sheets = {}
+    grouped = store_df.groupby(
+        [FILE_KEY_COLUMN, SHEET_COLUMN], sort=False, observed=True
+    )
+    for key, df in grouped:
+        sheets[key] = (
+            df.drop(columns=[FILE_KEY_COLUMN, SHEET_COLUMN])
+            .reset_index(drop=True)
+        )
+    return sheets
+
+def load_population_store() -> Dict[Tuple[str, str], pd.DataFrame]:
+    """カラムナーストアを読み込む
+
+    ワークブックが更新されていればストアを再構築する
+
+    Returns:
+        Dict[Tuple[str, str], pd.DataFrame]: (年度, シート名)をキーとした人口データ
+    """
+    manifest = _read_manifest()
+    fingerprint = _current_fingerprint(manifest)
+    key = _fingerprint_key(fingerprint)
+
+    # mtimeだけが変わった（内容は同じ）場合はマニフェストのみ更新
+    if manifest.get('key') == key and manifest.get('files') != fingerprint:
+        try:
+            _write_manifest(fingerprint)
+        except OSError:
+            pass
+
+    # 一部のワークブックを読み込めなかった場合は、そのエラーもキーに含める
+    # （ワークブックが変わらない限り、欠けたストアをメモリ上で使い続ける）
+    errors = get_sheet_catalog().errors
+    memory_key = (key, tuple(sorted(errors.items())))
+
+    # 同じ内容をすでにプロセス内で読み込んでいればそれを使う
+    if _loaded_store['fingerprint'] == memory_key:
+        profiling.count('population_store.memory_hits')
+        return _loaded_store['sheets']
+
+    # 読み込み・再構築は同時に1つだけ行い、他のスレッドはその結果を使う
+    with _lock:
+        if _loaded_store['fingerprint'] == memory_key:
+            profiling.count('population_store.memory_hits')
+            return _loaded_store['sheets']
+
+        store_df = None
+        if not errors and manifest.get('key') == key and STORE_PATH.exists():
+            try:
+                with profiling.span('read_parquet'):
+                    store_df = pd.read_parquet(STORE_PATH)
+                profiling.count('population_store.disk_loads')
+            except Exception:
+                # 壊れたストアは作り直す
+                store_df = None
+
+        if store_df is None:
+            with profiling.span('build_population_store'):
+                store_df = build_population_store()
+            profiling.count('population_store.rebuilds')
+
+            # 一部のワークブックを読み込めなかったストアはディスクに保存しない
+            # （ディスク上のストアはワークブックの内容だけで判定するため、欠けたまま使われ続ける）
+            if not errors:
+                try:
+                    _write_store(store_df, fingerprint)
+                except OSError:
+                    # 書き込めない環境ではメモリ上のストアのみを使う
+                    pass
+
+        _loaded_store['sheets'] = _split_by_sheet(store_df)
+        _loaded_store['fingerprint'] = memory_key
+        return _loaded_store['sheets']
+
+def read_population_sheet(year: str, sheet_name: str) -> pd.DataFrame:
+    """ストアから1シート分の人口データを取得する
+
+    Args:
+        year: ファイル識別子（例: "R6"）
+        sheet_name: ワークブック内の実際のシート名（例: "R6.12.1"）
+    """
+    sheets = load_population_store()
+    if (year, sheet_name) not in sheets:
+        # カタログ外のシートはExcelから直接読み込む
+        return read_choufu_population_excel_sheet(
+            POPULATION_DATA_FILES[year], sheet_name
+        )
+    return sheets[(year, sheet_name)].copy()
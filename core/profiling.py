@@ -0,0 +1,176 @@
+import json
+import os
+import threading
+import time
+from datetime import datetime
+from functools import wraps
+from typing import Callable, Dict, List, Optional, Union
+
+from core.constants import CACHE_DIR
+
+# 計測を常に有効にする環境変数（"1"で有効）
+PROFILE_ENV = 'CHOFU_PROFILE'
+
+# 計測結果を1再実行1行で追記するファイル
+TRACE_PATH = CACHE_DIR / 'trace.jsonl'
+
+class Trace:
+    """1回の再実行（ページのrun()）で記録した計測結果"""
+
+    def __init__(self, page: str):
+        self.page = page
+        self.started_at = datetime.now()
+        self.total_ms: Optional[float] = None
+        # 区間ごとの開始時刻・処理時間（ミリ秒）と入れ子の深さ
+        self.spans: List[dict] = []
+        # 地図に埋め込むデータなどのサイズ（バイト）
+        self.sizes: Dict[str, int] = {}
+        # キャッシュの呼び出し回数・ミス回数などのカウンター
+        self.counters: Dict[str, int] = {}
+        self._origin = time.perf_counter()
+        self._depth = 0
+
+    def caches(self) -> Dict[str, dict]:
+        """キャッシュごとのヒット・ミスの回数を集計する"""
+        caches = {}
+        for name, value in self.counters.items():
+            if name.endswith('.calls'):
+                cache_name = name[:-len('.calls')]
+                misses = self.counters.get(f'{cache_name}.misses', 0)
+                caches[cache_name] = {
+                    'calls': value,
+                    'hits': value - misses,
+                    'misses': misses,
+                }
+        return caches
+
+    def to_dict(self) -> dict:
+        return {
+            'page': self.page,
+            'started_at': self.started_at.isoformat(timespec='milliseconds'),
+            'total_ms': self.total_ms,
+            'spans': self.spans,
+            'sizes': self.sizes,
+            'counters': self.counters,
+            'caches': self.caches(),
+        }
+
+class _Span:
+    """処理時間を計測する区間（with文で使う）"""
+
+    __slots__ = ('trace', 'name', 'start', 'depth')
+
+    def __init__(self, trace: Trace, name: str):
+        self.trace = trace
+        self.name = name
+
+    def __enter__(self):
+        self.depth = self.trace._depth
+        self.trace._depth += 1
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        end = time.perf_counter()
+        self.trace._depth -= 1
+        self.trace.spans.append({
+            'name': self.name,
+            'start_ms': round((self.start - self.trace._origin) * 1000, 3),
+            'duration_ms': round((end - self.start) * 1000, 3),
+            'depth': self.depth,
+        })
+        return False
+
+class _NullSpan:
+    """計測が無効なときに使う何もしない区間（使い回す）"""
+
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+_NULL_SPAN = _NullSpan()
+
+# 再実行はセッションごとのスレッドで行われるため、計測中のトレースはスレッドごとに持つ
+_local = threading.local()
+_write_lock = threading.Lock()
+
+def enabled_by_env() -> bool:
+    """環境変数で計測が有効になっているか"""
+    return os.environ.get(PROFILE_ENV, '') not in ('', '0')
+
+def start_trace(page: str, enabled: bool) -> Optional[Trace]:
+    """このスレッドで計測を開始する（無効の場合は何も記録しない）"""
+    trace = Trace(page) if enabled else None
+    _local.trace = trace
+    return trace
+
+def finish_trace(write: bool = True) -> Optional[Trace]:
+    """このスレッドの計測を終了し、結果をJSON Linesのファイルに追記する"""
+    trace = getattr(_local, 'trace', None)
+    _local.trace = None
+    if trace is None:
+        return None
+
+    trace.total_ms = round((time.perf_counter() - trace._origin) * 1000, 3)
+    if write:
+        try:
+            TRACE_PATH.parent.mkdir(parents=True, exist_ok=True)
+            line = json.dumps(trace.to_dict(), ensure_ascii=False)
+            with _write_lock, open(TRACE_PATH, 'a', encoding='utf-8') as f:
+                f.write(line + '\n')
+        except OSError:
+            pass
+    return trace
+
+def span(name: str):
+    """処理時間を計測する区間を返す（計測が無効なら何もしない）"""
+    trace = getattr(_local, 'trace', None)
+    if trace is None:
+        return _NULL_SPAN
+    return _Span(trace, name)
+
+def timed(name: Optional[str] = None) -> Callable:
+    """関数全体の処理時間を計測するデコレーター"""
+    def decorator(func: Callable) -> Callable:
+        span_name = name or func.__name__
+
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            trace = getattr(_local, 'trace', None)
+            if trace is None:
+                return func(*args, **kwargs)
+            with _Span(trace, span_name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+def count(name: str, n: int = 1) -> None:
+    """カウンターを加算する"""
+    trace = getattr(_local, 'trace', None)
+    if trace is not None:
+        trace.counters[name] = trace.counters.get(name, 0) + n
+
+def record_size(name: str, size: Union[int, Callable[[], int]]) -> None:
+    """データのサイズ（バイト）を記録する
+
+    サイズの計算自体が重い場合は関数を渡すと、計測が有効なときだけ呼び出す
+    """
+    trace = getattr(_local, 'trace', None)
+    if trace is not None:
+        trace.sizes[name] = size() if callable(size) else size
+
+def cache_call(name: str):
+    """キャッシュされた関数の呼び出しを計測する区間を返す
+
+    キャッシュされた関数の本体ではcache_missを呼び、ヒット率を集計できるようにする
+    """
+    count(f'{name}.calls')
+    return span(name)
+
+def cache_miss(name: str) -> None:
+    """キャッシュされた関数の本体が実行された（キャッシュミス）ことを記録する"""
+    count(f'{name}.misses')
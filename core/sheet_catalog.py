@@ -0,0 +1,189 @@
+import json
+import threading
+from bisect import bisect_left
+from pathlib import Path
+from typing import Dict, List, NamedTuple, Optional
+
+from core.constants import CACHE_DIR, POPULATION_DATA_FILES
+from core.data_loader import convert_to_readable_date, list_sheet_names
+
+# シートカタログ（マニフェスト）の保存先
+CATALOG_PATH = CACHE_DIR / 'sheet_catalog.json'
+
+# カタログの形式を変えたときに上げるバージョン
+CATALOG_VERSION = 1
+
+class SheetEntry(NamedTuple):
+    """カタログ内の1シート分の情報"""
+    display_name: str  # 表示用の名前（例: "令和6年12月"）
+    sheet_info: str    # "年度:シート名" の形式（例: "R6:R6.12.1"）
+    year: int          # 令和の年（例: 6）
+    month: int         # 月（例: 12）
+
+class SheetCatalog:
+    """年月の降順に並べたシートの一覧と、その索引"""
+
+    def __init__(self, entries: List[SheetEntry], errors: Dict[str, str]):
+        self.entries = entries
+        # 読み込みに失敗したワークブック（パス → エラーメッセージ）
+        self.errors = errors
+        self._by_info = {entry.sheet_info: i for i, entry in enumerate(entries)}
+        self._by_year_month = {}
+        for i, entry in enumerate(entries):
+            # 同じ年月が複数ある場合は先に並んでいる方を使う
+            self._by_year_month.setdefault((entry.year, entry.month), i)
+        # 二分探索用の昇順キー（entriesは降順なので符号を反転）
+        self._sort_keys = [(-entry.year, -entry.month) for entry in entries]
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def __iter__(self):
+        return iter(self.entries)
+
+    def __getitem__(self, index: int) -> SheetEntry:
+        return self.entries[index]
+
+    def get(self, sheet_info: str) -> Optional[SheetEntry]:
+        """シート情報からエントリを取得する"""
+        index = self._by_info.get(sheet_info)
+        return None if index is None else self.entries[index]
+
+    def find(self, year: int, month: int) -> Optional[SheetEntry]:
+        """年月からエントリを取得する（存在しない場合はNone）"""
+        index = self._by_year_month.get((year, month))
+        return None if index is None else self.entries[index]
+
+    def latest_before(self, year: int, month: int) -> Optional[SheetEntry]:
+        """指定した年月より前で最も新しいエントリを取得する"""
+        index = bisect_left(self._sort_keys, (-year, -month))
+        # 同じ年月のエントリは飛ばす
+        while (index < len(self.entries)
+               and self._sort_keys[index] == (-year, -month)):
+            index += 1
+        return self.entries[index] if index < len(self.entries) else None
+
+    def as_tuples(self) -> List[tuple[str, str]]:
+        """(表示用シート名, シート情報)のリストを返す"""
+        return [(entry.display_name, entry.sheet_info) for entry in self.entries]
+
+# プロセス内で保持しているカタログ
+_catalog: Optional[SheetCatalog] = None
+_catalog_files: Optional[Dict[str, dict]] = None
+_lock = threading.Lock()
+
+def _file_stats() -> Dict[str, dict]:
+    """各ワークブックのmtimeとサイズを取得する"""
+    stats = {}
+    for year, file_path in POPULATION_DATA_FILES.items():
+        try:
+            stat = Path(file_path).stat()
+            stats[year] = {
+                'path': str(file_path),
+                'mtime_ns': stat.st_mtime_ns,
+                'size': stat.st_size,
+            }
+        except OSError:
+            stats[year] = {'path': str(file_path), 'mtime_ns': None, 'size': None}
+    return stats
+
+def _parse_year_month(sheet_name: str) -> tuple[int, int]:
+    """シート名から令和の年と月を取り出す（例: "R6.12.1" → (6, 12)）"""
+    year = int(sheet_name[1:].split('.')[0])
+    month = int(sheet_name.split('.')[1])
+    return year, month
+
+def build_sheet_catalog() -> SheetCatalog:
+    """全ワークブックのシート名からカタログを作成する"""
+    entries = []
+    errors = {}
+
+    for year, file_path in POPULATION_DATA_FILES.items():
+        try:
+            sheet_names = list_sheet_names(file_path)
+        except Exception as e:
+            errors[str(file_path)] = str(e)
+            continue
+
+        for name in sheet_names:
+            # R4ファイルのR3.5.1を表示上R4.5.1として扱う
+            display_name = 'R4.5.1' if (year == 'R4' and name == 'R3.5.1') else name
+
+            # 日付の解析に失敗した場合はスキップ
+            try:
+                sheet_year, sheet_month = _parse_year_month(display_name)
+            except:
+                continue
+
+            # R4.3.1より前のデータは除外（データのフォーマットが違うため）
+            if sheet_year < 4 or (sheet_year == 4 and sheet_month <= 3):
+                continue
+
+            entries.append(SheetEntry(
+                convert_to_readable_date(display_name),
+                f'{year}:{display_name}',
+                sheet_year,
+                sheet_month
+            ))
+
+    # 年月の降順でソート（同じ年月はワークブックの順序を保つ）
+    entries.sort(key=lambda entry: (-entry.year, -entry.month))
+    return SheetCatalog(entries, errors)
+
+def _read_catalog_file(files: Dict[str, dict]) -> Optional[SheetCatalog]:
+    """ディスク上のカタログを読み込む（ワークブックが変わっていればNone）"""
+    try:
+        with open(CATALOG_PATH, encoding='utf-8') as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return None
+
+    if manifest.get('version') != CATALOG_VERSION or manifest.get('files') != files:
+        return None
+
+    entries = [SheetEntry(*entry) for entry in manifest['entries']]
+    return SheetCatalog(entries, {})
+
+def _write_catalog_file(catalog: SheetCatalog, files: Dict[str, dict]) -> None:
+    """カタログをディスクに保存する"""
+    manifest = {
+        'version': CATALOG_VERSION,
+        'files': files,
+        'entries': [list(entry) for entry in catalog.entries],
+    }
+    CATALOG_PATH.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = CATALOG_PATH.with_suffix('.json.tmp')
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2)
+    tmp_path.replace(CATALOG_PATH)
+
+def get_sheet_catalog() -> SheetCatalog:
+    """シートカタログを取得する
+
+    ワークブックのmtimeとサイズが変わらない限り、メモリまたはディスク上の
+    カタログを再利用し、ワークブックを開かない
+    """
+    global _catalog, _catalog_files
+
+    files = _file_stats()
+    if _catalog is not None and _catalog_files == files:
+        return _catalog
+
+    with _lock:
+        # 他のスレッドが更新済みでないか再確認
+        if _catalog is not None and _catalog_files == files:
+            return _catalog
+
+        catalog = _read_catalog_file(files)
+        if catalog is None:
+            catalog = build_sheet_catalog()
+            # 読み込みに失敗したワークブックがある場合はディスクに保存せず、
+            # プロセス内ではワークブックのmtimeとサイズが変わるまで使う
+            if not catalog.errors:
+                try:
+                    _write_catalog_file(catalog, files)
+                except OSError:
+                    pass
+
+        _catalog, _catalog_files = catalog, files
+        return catalog
@@ -0,0 +1,169 @@
+"""町丁目名の表記ゆれを吸収し、町丁目ごとに整数のIDを割り当てる索引
+
+ワークブックの住所（全角数字・空白の詰め物あり）と境界データのS_NAME
+（漢数字）を同じ表記に正規化し、結合は文字列ではなく整数のIDで行う
+"""
+import json
+import logging
+import threading
+from typing import Dict, List, Optional, Set
+
+import numpy as np
+import pandas as pd
+
+from core import profiling
+
+# 算用数字（全角・半角）を漢数字に、ヶ・ヵをケに揃え、空白（全角・半角）を削除する変換表
+# 調布市の丁目は1桁のため、数字は1文字ずつ置き換える
+_NORMALIZE_TABLE = str.maketrans(
+    '０１２３４５６７８９0123456789ヶヵ',
+    '〇一二三四五六七八九〇一二三四五六七八九ケケ',
+    ' 　\t\r\n'
+)
+
+logger = logging.getLogger(__name__)
+
+_town_index: Optional['TownIndex'] = None
+# 索引を作ったときのTopoJSONのパス・更新時刻・サイズ（変わっていれば作り直す）
+_town_index_stamp: Optional[tuple] = None
+_lock = threading.Lock()
+
+# 境界データに対応する町丁目が見つからなかった住所（正規化後）
+_unmatched: Set[str] = set()
+
+def normalize_town_name(name) -> str:
+    """町丁目名を正規化する（文字列でない場合は空文字列）"""
+    if not isinstance(name, str):
+        return ''
+    return name.translate(_NORMALIZE_TABLE)
+
+def normalize_town_names(names: pd.Series) -> pd.Series:
+    """町丁目名の列を正規化する
+
+    同じ住所は全ての行で同じ表記のため、重複を除いた値だけを1回ずつ変換する
+    """
+    codes, uniques = pd.factorize(names)
+    # 欠損値（コード-1）は末尾の空文字列になる
+    normalized = np.array(
+        [normalize_town_name(name) for name in uniques] + [''], dtype=object
+    )
+    return pd.Series(normalized[codes], index=names.index, name=names.name)
+
+class TownIndex:
+    """正規化した町丁目名と整数IDの対応表
+
+    IDは境界データで最初に出現した順に0から割り当てる
+    （複数のポリゴンに分かれている町丁目も1つのIDになる）
+    """
+
+    def __init__(self, names: List[str]):
+        self.towns: List[str] = []
+        self._ids: Dict[str, int] = {}
+        for name in names:
+            key = normalize_town_name(name)
+            if key and key not in self._ids:
+                self._ids[key] = len(self.towns)
+                self.towns.append(name)
+
+    def __len__(self) -> int:
+        return len(self.towns)
+
+    def ids(self, names: pd.Series) -> np.ndarray:
+        """町丁目名の列をIDの配列に変換する（見つからない場合は-1）"""
+        if isinstance(names.dtype, pd.CategoricalDtype):
+            # カテゴリごとに1回だけ引き、コードで展開する
+            category_ids = np.array(
+                [self._ids.get(normalize_town_name(name), -1)
+                 for name in names.cat.categories] + [-1],
+                dtype=np.int32
+            )
+            return category_ids[names.cat.codes.to_numpy()]
+
+        codes, uniques = pd.factorize(names)
+        unique_ids = np.array(
+            [self._ids.get(normalize_town_name(name), -1) for name in uniques] + [-1],
+            dtype=np.int32
+        )
+        return unique_ids[codes]
+
+    def positions(self, names: pd.Series) -> np.ndarray:
+        """各IDについて、namesで最初に出現した行の位置を返す（ない場合は-1）"""
+        town_ids = self.ids(names)
+        matched = np.flatnonzero(town_ids >= 0)
+        positions = np.full(len(self.towns), -1, dtype=np.int64)
+        # 同じIDが複数ある場合は先に出現した行を残す
+        # （代入で同じ位置に複数回書き込む順序はNumPyが保証しないため、np.uniqueで選ぶ）
+        unique_ids, first = np.unique(town_ids[matched], return_index=True)
+        positions[unique_ids] = matched[first]
+        return positions
+
+    def unmatched(self, names: pd.Series) -> List[str]:
+        """索引にない町丁目名（空の住所を除く）を返す"""
+        town_ids = self.ids(names)
+        missing = pd.unique(names[town_ids < 0].astype(object))
+        return [name for name in missing if normalize_town_name(name)]
+
+def _read_town_names() -> List[str]:
+    """TopoJSONの属性から町丁目名を取得する（ジオメトリはデコードしない）"""
+    # 循環インポートを避けるため関数内でインポート
+    from core.data_loader import DataPaths
+
+    with open(DataPaths.TOPOJSON_PATH, encoding='utf-8') as f:
+        topology = json.load(f)
+
+    return [
+        geometry.get('properties', {}).get('S_NAME')
+        for geometry in topology['objects']['town']['geometries']
+    ]
+
+def get_town_index() -> TownIndex:
+    """境界データの町丁目名から作った索引を取得する（プロセス内で共有）
+
+    TopoJSONが更新された場合は作り直す
+    """
+    global _town_index, _town_index_stamp
+
+    # 循環インポートを避けるため関数内でインポート
+    from core.data_loader import DataPaths, file_stamp
+
+    stamp = file_stamp(DataPaths.TOPOJSON_PATH)
+    if _town_index is None or _town_index_stamp != stamp:
+        with _lock:
+            if _town_index is None or _town_index_stamp != stamp:
+                _town_index = TownIndex(_read_town_names())
+                _town_index_stamp = stamp
+                _unmatched.clear()
+    return _town_index
+
+def clear_town_index() -> None:
+    """共有している索引を破棄する（次回アクセス時に作り直す）"""
+    global _town_index, _town_index_stamp
+
+    with _lock:
+        _town_index = None
+        _town_index_stamp = None
+        _unmatched.clear()
+
+def report_unmatched(names: pd.Series) -> List[str]:
+    """境界データに対応する町丁目がない住所を記録し、初めて見つかったものを警告する
+
+    Returns:
+        List[str]: namesのうち索引になかった住所
+    """
+    unmatched = get_town_index().unmatched(names)
+    if unmatched:
+        profiling.count('town_index.unmatched', len(unmatched))
+        with _lock:
+            new_names = [name for name in unmatched if name not in _unmatched]
+            _unmatched.update(new_names)
+        if new_names:
+            logger.warning(
+                '境界データに対応する町丁目が見つからない住所があります: %s',
+                ', '.join(new_names)
+            )
+    return unmatched
+
+def get_unmatched_names() -> List[str]:
+    """これまでに見つかった、境界データに対応する町丁目がない住所"""
+    with _lock:
+        return sorted(_unmatched)
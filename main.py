@@ -1,5 +1,5 @@
 import streamlit as st
-from components import population_heatmap, population_time_series
+from utils.warmup import start_warmup
 
 # ページの設定
 st.set_page_config(
@@ -8,17 +8,23 @@ st.set_page_config(
     layout='wide'
 )
 
-# ブラウザキャッシュの無効化
-st.markdown('''
-    <meta http-equiv="Cache-Control" content="no-cache, no-store, must-revalidate">
-    <meta http-equiv="Pragma" content="no-cache">
-    <meta http-equiv="Expires" content="0">
-''', unsafe_allow_html=True)
+# 最初のアクセスを待たずに、バックグラウンドでキャッシュを読み込み始める
+start_warmup()
+
+# 各ページのモジュールは表示するときに初めて読み込む
+# （ヒートマップのgeopandas・folium、推移グラフのplotlyを起動時に読み込まない）
+def heatmap_page():
+    from components import population_heatmap
+    population_heatmap.run()
+
+def time_series_page():
+    from components import population_time_series
+    population_time_series.run()
 
 # ナビゲーションの設定
 current_page = st.navigation([
-    st.Page(population_heatmap.run, title='人口ヒートマップ', url_path='heatmap'),
-    st.Page(population_time_series.run, title='人口推移グラフ', url_path='time_series'),
+    st.Page(heatmap_page, title='人口ヒートマップ', url_path='heatmap'),
+    st.Page(time_series_page, title='人口推移グラフ', url_path='time_series'),
 ])
 
 current_page.run()
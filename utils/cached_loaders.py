@@ -0,0 +1,38 @@
+"""全セッションで共有するキャッシュを通したデータの読み込み
+
+ページとバックグラウンドの事前読み込みが同じキャッシュのキーを使うよう、
+キャッシュ付きの読み込み関数はこのモジュールにまとめる。
+キーには元データのバージョンを含め、ファイルが更新されると読み込み直す
+"""
+from core import profiling
+from core.city_totals import build_city_totals
+from core.data_loader import load_data, load_school_points, source_version
+from core.frame_cache import cache_frame
+from core.population_history import build_population_history
+
+@cache_frame(version=source_version)
+def load_cached_data(sheet_info):
+    """データを読み込み、全セッションで共有するキャッシュに保持する"""
+    profiling.cache_miss('load_cached_data')
+    return load_data(sheet_info)
+
+@cache_frame(version=source_version)
+def load_cached_history():
+    """全ての年月の人口履歴を読み込み、全セッションで共有するキャッシュに保持する"""
+    profiling.cache_miss('load_cached_history')
+    return build_population_history()
+
+@cache_frame(version=source_version)
+def load_cached_school_points(file_path):
+    """学校の位置の表を読み込み、全セッションで共有するキャッシュに保持する
+
+    小学校・中学校で同じ表を使い、種別での絞り込みは呼び出し側で行う
+    """
+    profiling.cache_miss('load_cached_school_points')
+    return load_school_points(file_path)
+
+@cache_frame(version=source_version)
+def load_cached_totals():
+    """全ての年月の市全体の合計を集計し、全セッションで共有するキャッシュに保持する"""
+    profiling.cache_miss('load_cached_totals')
+    return build_city_totals()
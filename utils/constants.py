@@ -1,13 +1,7 @@
-from pathlib import Path
+import os
 
-# データファイルのパスを更新
-POPULATION_DATA_FILES = {
-    'R6': 'data/choufushi_open_data_chouchoubetu1201.xlsx',  # 令和6年のデータ
-    'R5': 'data/choufushi_open_data_r5chouchoubetu.xlsx',    # 令和5年のデータ
-    'R4': 'data/choufushi_open_data_r4chouchoubetu.xlsx',    # 令和4年のデータ
-    'R3': 'data/choufushi_open_data_r3chouchoubetu.xlsx'     # 令和3年のデータを追加
-}
-SCHOOL_DATA_PATH = Path('data/choufushi_open_data_school.xls')
+# データファイルの場所とキャッシュの設定はcoreと共通（同じ辞書を参照する）
+from core.constants import POPULATION_DATA_FILES, SCHOOL_DATA_PATH, CACHE_DIR
 
 # 地図の中心座標（佐須町二丁目）
 CENTER_LAT = 35.660076
@@ -23,4 +17,8 @@ STATIONS = {
     '調布駅': {'lat': 35.651788, 'lon': 139.5447823},
     '西調布駅': {'lat': 35.6570844, 'lon': 139.5300797},
     '飛田給駅': {'lat': 35.6600815, 'lon': 139.5235242}
-} 
\ No newline at end of file
+} 
+
+# 描画済みの地図をディスクにも保存するか（"0"で無効）と、保存する最大件数
+RENDERED_MAP_DISK_CACHE = os.environ.get('CHOFU_MAP_DISK_CACHE', '1') != '0'
+RENDERED_MAP_DISK_MAX_FILES = 200
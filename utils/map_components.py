@@ -1,7 +1,27 @@
+import base64
+import html
+import json
 import folium
-from folium import Map, Choropleth, GeoJson, Marker, DivIcon, Icon
-from utils.map_styles import STYLE_FUNC, HIGHLIGHT_FUNC, TOOLTIP_STYLE, CENTER_LABEL_STYLE
+import geopandas as gpd
+import numpy as np
+import pandas as pd
+from typing import Optional, Union
+from branca.colormap import StepColormap
+from branca.element import MacroElement
+from branca.utilities import color_brewer
+from folium import Map, FeatureGroup, GeoJson, Marker, DivIcon, Icon
+from folium.plugins import FastMarkerCluster
+from jinja2 import Template
+from utils.map_styles import (
+    POPULATION_STYLE_FUNC, HIGHLIGHT_FUNC, TOOLTIP_STYLE, CENTER_LABEL_STYLE,
+    CHOROPLETH_PALETTE, CHOROPLETH_BINS, NAN_FILL_COLOR, FILL_COLOR_PROPERTY,
+    AREA_LABEL_FONT, AREA_LABEL_COLOR, POPULATION_STYLE,
+    SLIDER_INDEX_PROPERTY, SLIDER_CONTROL_STYLE, SLIDER_INTERVAL_MS,
+    FACILITY_MARKER_STYLES, FACILITY_DEFAULT_STYLE, FACILITY_CLUSTER_OPTIONS
+)
 from utils.constants import STATIONS
+from core.data_loader import ColumnNames
+from core import profiling
 
 def create_base_map(lat: float, lon: float, zoom: int = 14) -> Map:
     """ベースとなる地図を作成"""
@@ -11,6 +31,10 @@ def create_base_map(lat: float, lon: float, zoom: int = 14) -> Map:
         zoom_start=zoom
     )
 
+def create_layer_group(name: str) -> FeatureGroup:
+    """月や表示設定によって変わるレイヤーをまとめるグループを作成"""
+    return FeatureGroup(name=name, control=False)
+
 def add_center_label(map_obj: Map, lat: float, lon: float, label: str) -> None:
     """中心地点のラベルを追加"""
     Marker(
@@ -22,55 +46,372 @@ def add_center_label(map_obj: Map, lat: float, lon: float, label: str) -> None:
         )
     ).add_to(map_obj)
 
-def add_choropleth(map_obj: Map, data: dict, columns: list) -> None:
-    """人口ヒートマップを追加"""
-    choropleth = Choropleth(
-        geo_data=data,
-        data=data,
-        columns=columns,
-        key_on="feature.properties.S_NAME",
-        fill_color='YlOrRd',
-        nan_fill_color='darkgray',
-        fill_opacity=0.8,
-        nan_fill_opacity=0.8,
-        line_opacity=0.2,
-        legend_name="人口数",
-    )
-    choropleth.add_to(map_obj)
+@profiling.timed()
+def add_population_layer(
+    map_obj: Union[Map, FeatureGroup],
+    data: gpd.GeoDataFrame,
+    columns: list,
+    legend_name: str = '人口数'
+) -> None:
+    """人口ヒートマップとツールチップを1つのGeoJSONレイヤーとして追加
+
+    ポリゴンを1回だけ埋め込むため、塗り分けの色はPython側で事前に計算する
+    """
+    key_column, value_column = columns
+    bin_edges, colors = compute_color_bins(data, key_column, value_column)
+
+    # 描画とツールチップに必要な属性だけを埋め込む
+    layer_df = data[[key_column, value_column, data.geometry.name]].copy()
+    layer_df[FILL_COLOR_PROPERTY] = colors
 
-def add_tooltips(map_obj: Map, data: dict) -> None:
-    """ツールチップを追加"""
-    choropleth_info = GeoJson(
-        data=data,
-        style_function=STYLE_FUNC,
+    population_layer = GeoJson(
+        data=layer_df,
+        style_function=POPULATION_STYLE_FUNC,
         highlight_function=HIGHLIGHT_FUNC,
         control=False,
         tooltip=folium.GeoJsonTooltip(
-            fields=["住所", "人口数"],
+            fields=[key_column, value_column],
             aliases=['住所: ', '人口数: '],
             labels=True,
             sticky=True,
             style=TOOLTIP_STYLE,
         )
     )
-    map_obj.add_child(choropleth_info)
-    map_obj.keep_in_front(choropleth_info)
+    map_obj.add_child(population_layer)
+    profiling.record_size(
+        'population_geojson', lambda: _json_size(population_layer.data)
+    )
+    if isinstance(map_obj, Map):
+        map_obj.keep_in_front(population_layer)
 
-def add_school_markers(map_obj: Map, school_df: dict, color: str) -> None:
-    """学校のマーカーを追加"""
-    for _, row in school_df.iterrows():
-        Marker(
-            location=[row['緯度'], row['経度']],
-            popup=row['学校名'],
-            icon=Icon(
-                color=color,
-                icon='graduation-cap',
-                prefix='fa'
-            ),
-            tooltip=row['学校名']
-        ).add_to(map_obj) 
+    # 凡例（folium.Choroplethと同じ階級区分のカラーマップ）
+    if bin_edges is not None:
+        ReplaceableLegend(
+            color_brewer(CHOROPLETH_PALETTE, n=len(bin_edges) - 1),
+            index=list(bin_edges),
+            vmin=bin_edges[0],
+            vmax=bin_edges[-1],
+            caption=legend_name,
+        ).add_to(map_obj)
+
+class ReplaceableLegend(StepColormap):
+    """FeatureGroup内に置いても地図に追加され、前回の凡例と置き換わるカラーマップ
+
+    st_foliumのfeature_group_to_addで差分更新するとき、凡例が重ならないようにする
+    """
+    _template = Template("""
+        {% macro script(this, kwargs) %}
+        if (window.populationLegend) {
+            window.populationLegend.remove();
+        }
+        {{ this.legend_script() }}
+        window.populationLegend = {{ this.get_name() }}.legend;
+        {% endmacro %}
+    """)
+
+    def legend_script(self) -> str:
+        """branca標準の凡例のスクリプトを、親の地図を対象にして生成する"""
+        parent = self._parent
+        # 標準テンプレートは親要素に凡例を追加するため、一時的に地図を親にする
+        self._parent = _find_parent_map(self)
+        try:
+            return StepColormap._template.module.script(self, {})
+        finally:
+            self._parent = parent
+
+def _find_parent_map(element: MacroElement) -> Map:
+    """要素を含む地図をたどって取得する（FeatureGroup内の要素にも対応）"""
+    map_obj = element._parent
+    while not isinstance(map_obj, Map):
+        map_obj = map_obj._parent
+    return map_obj
+
+@profiling.timed()
+def compute_color_bins(
+    data: pd.DataFrame,
+    key_column: str,
+    value_column: str,
+    bins: int = CHOROPLETH_BINS
+) -> tuple[Optional[np.ndarray], list]:
+    """値を等間隔の階級に分け、各行の塗りつぶし色を返す
+
+    folium.Choroplethと同じ区分（np.histogramの境界、右端を含む）で、
+    キーや値が欠けている行はNaN用の色にする
+    """
+    values = data[value_column].to_numpy(dtype=float)
+    real_values = values[~np.isnan(values)]
+    if real_values.size == 0:
+        return None, [NAN_FILL_COLOR] * len(values)
+
+    _, bin_edges = np.histogram(real_values, bins=bins)
+    palette = np.array(color_brewer(CHOROPLETH_PALETTE, n=len(bin_edges) - 1))
+
+    # 最大値も最後の階級に含まれるように右端をわずかに広げる
+    digitize_edges = bin_edges.astype(float)
+    digitize_edges[-1] = np.nextafter(digitize_edges[-1], np.inf)
+    color_index = np.clip(
+        np.digitize(np.nan_to_num(values), digitize_edges, right=False) - 1,
+        0, len(palette) - 1
+    )
+
+    missing = np.isnan(values) | data[key_column].isna().to_numpy()
+    colors = np.where(missing, NAN_FILL_COLOR, palette[color_index])
+    return bin_edges, colors.tolist()
+
+class MonthSliderLayer(MacroElement):
+    """全月分の人口をブラウザに一度だけ送り、スライダーで塗り分けを切り替えるレイヤー
+
+    境界は1回だけ埋め込み、人口は(月 × 町丁目)のInt32配列をbase64で詰めて送る。
+    月の切り替えはブラウザ内で色とツールチップを更新するだけで、サーバーとは通信しない
+    """
+    _template = Template("""
+        {% macro script(this, kwargs) %}
+        (function () {
+            var config = {{ this.config|tojson }};
+            var map = {{ this.map_name }};
+            var group = {{ this._parent.get_name() }};
+
+            // 詳細度の切り替えなどでレイヤーが差し替えられた場合は、表示中の月を引き継ぐ
+            var previous = window.monthSlider;
+            var current = config.initial;
+            if (previous && previous.initial === config.initial
+                    && previous.index < config.labels.length) {
+                current = previous.index;
+            }
+
+            // base64で詰めた人口（月ごとに町丁目の数だけ並ぶ、欠損は-1）
+            var raw = atob(config.values);
+            var bytes = new Uint8Array(raw.length);
+            for (var i = 0; i < raw.length; i++) bytes[i] = raw.charCodeAt(i);
+            var values = new Int32Array(bytes.buffer);
+
+            function valueOf(feature) {
+                var town = feature.properties[config.index_property];
+                return town < 0 ? -1 : values[current * config.n_towns + town];
+            }
+            function colorOf(value) {
+                if (value < 0) return config.nan_color;
+                // 右端を含む等間隔の階級（folium.Choroplethと同じ区分）
+                var bin = 0;
+                for (var k = 1; k < config.edges.length - 1; k++) {
+                    if (value >= config.edges[k]) bin = k;
+                }
+                return config.palette[bin];
+            }
+            function style(feature) {
+                return Object.assign(
+                    {fillColor: colorOf(valueOf(feature))}, config.style
+                );
+            }
+            function tooltip(layer) {
+                var value = valueOf(layer.feature);
+                return '<div style="' + config.tooltip_style + '">' +
+                    '<b>住所: </b>' + layer.feature.properties[config.name_property] +
+                    '<br><b>人口数: </b>' + (value < 0 ? '-' : value.toLocaleString()) +
+                    '</div>';
+            }
+
+            var layer = L.geoJson(config.geojson, {
+                style: style,
+                onEachFeature: function (feature, featureLayer) {
+                    featureLayer.bindTooltip(tooltip, {sticky: true});
+                    featureLayer.on({
+                        mouseover: function (e) { e.target.setStyle(config.highlight); },
+                        mouseout: function (e) { layer.resetStyle(e.target); }
+                    });
+                }
+            }).addTo(group);
+
+            // 月を選ぶスライダー（再生ボタンで順番に切り替え）
+            var state = {index: current, initial: config.initial, timer: null};
+            var control = L.control({position: 'bottomleft'});
+            control.onAdd = function () {
+                var div = L.DomUtil.create('div', 'leaflet-bar month-slider');
+                div.style.cssText = config.control_style;
+                div.innerHTML =
+                    '<button type="button">▶</button> ' +
+                    '<input type="range" min="0" max="' + (config.labels.length - 1) +
+                    '" step="1" style="width: 240px; vertical-align: middle;"> ' +
+                    '<span></span>';
+                L.DomEvent.disableClickPropagation(div);
+                L.DomEvent.disableScrollPropagation(div);
+
+                var button = div.querySelector('button');
+                var slider = div.querySelector('input');
+                var label = div.querySelector('span');
+                function show(index) {
+                    current = state.index = index;
+                    slider.value = index;
+                    label.textContent = config.labels[index];
+                    layer.setStyle(style);
+                }
+                slider.addEventListener('input', function () {
+                    show(parseInt(slider.value, 10));
+                });
+                button.addEventListener('click', function () {
+                    if (state.timer) {
+                        clearInterval(state.timer);
+                        state.timer = null;
+                        button.textContent = '▶';
+                        return;
+                    }
+                    button.textContent = '■';
+                    state.timer = setInterval(function () {
+                        show((current + 1) % config.labels.length);
+                    }, config.interval);
+                });
+                show(current);
+                return div;
+            };
+            control.addTo(map);
+            window.monthSlider = state;
+
+            // グループごと地図から取り除かれたらスライダーも片付ける
+            group.on('remove', function () {
+                clearInterval(state.timer);
+                control.remove();
+            });
+        })();
+        {% endmacro %}
+    """)
 
-def add_station_marker(map_obj: Map) -> None:
+    def __init__(self, config: dict):
+        super().__init__()
+        self._name = 'MonthSliderLayer'
+        self.config = config
+
+    @property
+    def map_name(self) -> str:
+        """スライダーを追加する地図の変数名"""
+        return _find_parent_map(self).get_name()
+
+@profiling.timed()
+def add_month_slider_layer(
+    map_obj: Union[Map, FeatureGroup],
+    data: gpd.GeoDataFrame,
+    towns: list,
+    labels: list,
+    values: np.ndarray,
+    initial_index: int,
+    legend_name: str = '人口数'
+) -> None:
+    """全月分の人口を埋め込んだスライダー付きのヒートマップを追加
+
+    アニメーションで変化が見えるよう、階級区分は全月共通にする
+
+    Args:
+        data: 町丁目の境界（S_NAMEを持つ）
+        towns: valuesの行に対応する町丁目名
+        labels: valuesの列に対応する年月の表示名
+        values: (町丁目数, 月数)の人口（データがない場合はNaN）
+        initial_index: 最初に表示する月の列番号
+    """
+    town_index = {town: i for i, town in enumerate(towns)}
+
+    # 境界は町丁目名とvaluesの行番号だけを属性として1回だけ埋め込む
+    layer_df = data[['S_NAME', data.geometry.name]].copy()
+    layer_df[SLIDER_INDEX_PROPERTY] = [
+        town_index.get(name, -1) for name in layer_df['S_NAME']
+    ]
+
+    # 全月共通の階級区分（folium.Choroplethと同じ等間隔の区分）
+    real_values = values[~np.isnan(values)]
+    if real_values.size == 0:
+        real_values = np.zeros(1)
+    _, bin_edges = np.histogram(real_values, bins=CHOROPLETH_BINS)
+    palette = color_brewer(CHOROPLETH_PALETTE, n=len(bin_edges) - 1)
+
+    # (月 × 町丁目)のInt32配列に詰める（欠損は-1）
+    packed = np.where(np.isnan(values), -1, np.round(values)).T
+    packed = np.ascontiguousarray(packed, dtype='<i4')
+
+    slider_geojson = json.loads(layer_df.to_json())
+    slider_values = base64.b64encode(packed.tobytes()).decode('ascii')
+    profiling.record_size('slider_geojson', lambda: _json_size(slider_geojson))
+    profiling.record_size('slider_values', len(slider_values))
+
+    MonthSliderLayer({
+        'geojson': slider_geojson,
+        'values': slider_values,
+        'n_towns': len(towns),
+        'labels': list(labels),
+        'initial': int(initial_index),
+        'edges': [float(edge) for edge in bin_edges],
+        'palette': palette,
+        'nan_color': NAN_FILL_COLOR,
+        'index_property': SLIDER_INDEX_PROPERTY,
+        'name_property': 'S_NAME',
+        'style': POPULATION_STYLE,
+        'highlight': HIGHLIGHT_FUNC(None),
+        'tooltip_style': TOOLTIP_STYLE,
+        'control_style': SLIDER_CONTROL_STYLE,
+        'interval': SLIDER_INTERVAL_MS,
+    }).add_to(map_obj)
+
+    ReplaceableLegend(
+        palette,
+        index=list(bin_edges),
+        vmin=bin_edges[0],
+        vmax=bin_edges[-1],
+        caption=legend_name,
+    ).add_to(map_obj)
+
+# 施設の配列の1行（[緯度, 経度, 名前, 色, アイコン]）からマーカーを作るJavaScript
+FACILITY_MARKER_CALLBACK = """
+    function (row) {
+        var icon = L.AwesomeMarkers.icon({
+            icon: row[4], prefix: 'fa', markerColor: row[3], iconColor: 'white'
+        });
+        return L.marker(new L.LatLng(row[0], row[1]), {icon: icon})
+            .bindPopup(row[2])
+            .bindTooltip(row[2]);
+    }
+"""
+
+@profiling.timed()
+def add_facility_markers(
+    map_obj: Union[Map, FeatureGroup],
+    points: pd.DataFrame,
+    name_column: str = ColumnNames.SCHOOL_NAME
+) -> None:
+    """施設（学校など）のマーカーを1つのクラスタレイヤーで追加
+
+    マーカーごとにPythonのオブジェクトを作らず、位置・名前・スタイルの配列だけを
+    埋め込み、ブラウザ側でマーカーを作る。施設が多い場合は縮小時にまとめて表示する
+
+    Args:
+        points: 名前・種別・緯度・経度を持つ施設の表
+        name_column: 施設名のカラム
+    """
+    if points.empty:
+        return
+
+    # 種別ごとの色とアイコン（カテゴリごとに1回だけ引く）
+    facility_types = points[ColumnNames.FACILITY_TYPE].astype(object)
+    styles = {
+        facility_type: FACILITY_MARKER_STYLES.get(facility_type, FACILITY_DEFAULT_STYLE)
+        for facility_type in facility_types.unique()
+    }
+    data = [
+        list(row) for row in zip(
+            points[ColumnNames.LATITUDE].round(6).tolist(),
+            points[ColumnNames.LONGITUDE].round(6).tolist(),
+            [html.escape(str(name)) for name in points[name_column]],
+            [styles[facility_type]['color'] for facility_type in facility_types],
+            [styles[facility_type]['icon'] for facility_type in facility_types],
+        )
+    ]
+    profiling.record_size('facility_markers_json', lambda: _json_size(data))
+
+    FastMarkerCluster(
+        data,
+        callback=FACILITY_MARKER_CALLBACK,
+        control=False,
+        **FACILITY_CLUSTER_OPTIONS
+    ).add_to(map_obj)
+
+@profiling.timed()
+def add_station_marker(map_obj: Union[Map, FeatureGroup]) -> None:
     """駅のマーカーを追加"""
     for station_name, coords in STATIONS.items():
         Marker(
@@ -84,20 +425,94 @@ def add_station_marker(map_obj: Map) -> None:
             tooltip=station_name
         ).add_to(map_obj) 
 
-def add_area_labels(map_obj: Map, data: dict) -> None:
-    """各エリアの中心にラベルを表示"""
-    for idx, row in data.iterrows():
-        centroid = row.geometry.centroid
-        lat = centroid.y
-        lon = centroid.x
-        name = row['S_NAME']
-        
-        if lat and lon and name:
-            Marker(
-                [lat, lon],
-                icon=DivIcon(
-                    html=f'<div style="{CENTER_LABEL_STYLE}">{name}</div>',
-                    icon_size=(60, 15),
-                    icon_anchor=(30, 7)
-                )
-            ).add_to(map_obj) 
\ No newline at end of file
+class CanvasLabelLayer(MacroElement):
+    """全エリアのラベルを1枚のcanvasに描画するLeafletレイヤー
+
+    ラベルごとにMarkerを作らないため、DOMノードは地図全体で1つだけになる
+    """
+    _template = Template("""
+        {% macro script(this, kwargs) %}
+        if (!L.CanvasLabelLayer) {
+            L.CanvasLabelLayer = L.Layer.extend({
+                initialize: function (labels, options) {
+                    this._labels = labels;
+                    L.setOptions(this, options);
+                },
+                onAdd: function (map) {
+                    if (!map.getPane(this.options.pane)) {
+                        var pane = map.createPane(this.options.pane);
+                        pane.style.zIndex = 450;
+                        pane.style.pointerEvents = 'none';
+                    }
+                    // ズームアニメーション中は非表示にし、終了後に描き直す
+                    this._canvas = L.DomUtil.create('canvas', 'leaflet-zoom-hide');
+                    map.getPane(this.options.pane).appendChild(this._canvas);
+                    map.on('moveend zoomend resize viewreset', this._redraw, this);
+                    this._redraw();
+                },
+                onRemove: function (map) {
+                    map.off('moveend zoomend resize viewreset', this._redraw, this);
+                    L.DomUtil.remove(this._canvas);
+                },
+                _redraw: function () {
+                    var map = this._map, size = map.getSize();
+                    var ratio = window.devicePixelRatio || 1, canvas = this._canvas;
+                    L.DomUtil.setPosition(canvas, map.containerPointToLayerPoint([0, 0]));
+                    canvas.width = size.x * ratio;
+                    canvas.height = size.y * ratio;
+                    canvas.style.width = size.x + 'px';
+                    canvas.style.height = size.y + 'px';
+
+                    var ctx = canvas.getContext('2d');
+                    ctx.setTransform(ratio, 0, 0, ratio, 0, 0);
+                    ctx.font = this.options.font;
+                    ctx.fillStyle = this.options.color;
+                    ctx.textAlign = 'center';
+                    ctx.textBaseline = 'middle';
+
+                    // 表示範囲内のラベルだけを描画する
+                    var bounds = map.getBounds().pad(0.1);
+                    for (var i = 0; i < this._labels.length; i++) {
+                        var latlng = L.latLng(this._labels[i][0], this._labels[i][1]);
+                        if (!bounds.contains(latlng)) continue;
+                        var point = map.latLngToContainerPoint(latlng);
+                        ctx.fillText(this._labels[i][2], point.x, point.y);
+                    }
+                }
+            });
+        }
+        var {{ this.get_name() }} = new L.CanvasLabelLayer(
+            {{ this.labels|tojson }},
+            {{ this.options|tojson }}
+        ).addTo({{ this._parent.get_name() }});
+        {% endmacro %}
+    """)
+
+    def __init__(self, labels: list, font: str, color: str):
+        super().__init__()
+        self._name = 'CanvasLabelLayer'
+        self.labels = labels
+        self.options = {'pane': 'areaLabels', 'font': font, 'color': color}
+
+@profiling.timed()
+def add_area_labels(map_obj: Map, label_points: pd.DataFrame) -> None:
+    """各エリアのラベルを1つのcanvasレイヤーで表示
+
+    Args:
+        label_points: S_NAME・緯度・経度を持つラベル位置（事前計算済み）
+    """
+    labels = [
+        [round(lat, 6), round(lon, 6), name]
+        for name, lat, lon in zip(
+            label_points['S_NAME'],
+            label_points[ColumnNames.LATITUDE],
+            label_points[ColumnNames.LONGITUDE]
+        )
+        if name and not pd.isna(name)
+    ]
+    profiling.record_size('area_labels', lambda: _json_size(labels))
+    CanvasLabelLayer(labels, AREA_LABEL_FONT, AREA_LABEL_COLOR).add_to(map_obj)
+
+def _json_size(data) -> int:
+    """地図に埋め込まれるJSONのおおよそのサイズ（バイト）"""
+    return len(json.dumps(data, ensure_ascii=False).encode('utf-8'))
@@ -0,0 +1,239 @@
+"""描画済みの地図（st_foliumがフロントエンドに送るHTML・JavaScript）のキャッシュ
+
+地図の内容は年月・表示方法・詳細度・表示するマーカーと元データのバージョンだけで
+決まるため、foliumでの組み立てとシリアライズの結果を保存しておき、同じ組み合わせの
+再表示ではPython側で地図を作らない。プロセス内の共有キャッシュとディスクの2段で保持する
+
+シリアライズとコンポーネントの呼び出しはst_folium_shim（st_foliumの処理の写し）で行い、
+インストールされているstreamlit_foliumが写したupstreamと一致しない場合は公開APIの
+st_foliumで毎回表示する
+"""
+import hashlib
+import json
+import shutil
+from pathlib import Path
+from typing import Callable, List, Optional
+
+import folium
+
+from utils.constants import (
+    CACHE_DIR, RENDERED_MAP_DISK_CACHE, RENDERED_MAP_DISK_MAX_FILES
+)
+from utils import st_folium_shim
+from core import data_loader
+from core.frame_cache import get_frame_cache
+from core import profiling
+
+# 描画済みの地図の保存先（元データのバージョンごとのディレクトリに分ける）
+RENDER_CACHE_DIR = CACHE_DIR / 'rendered_maps'
+
+# 地図の組み立て方や保存形式を変えたときに上げるバージョン
+RENDER_CACHE_VERSION = 2
+
+class RenderedMap:
+    """st_foliumのコンポーネントに渡す、描画済みの地図の内容"""
+
+    FIELDS = (
+        'script', 'header', 'html', 'map_id', 'feature_group',
+        'css_links', 'js_links', 'bounds', 'zoom', 'warnings',
+    )
+
+    def __init__(
+        self,
+        script: str,
+        header: str,
+        html: str,
+        map_id: str,
+        feature_group: str,
+        css_links: List[str],
+        js_links: List[str],
+        bounds: list,
+        zoom: Optional[float],
+        warnings: Optional[List[str]] = None,
+        errors: Optional[List[str]] = None,
+        complete: bool = True,
+        folium_map: Optional[folium.Map] = None,
+        feature_groups: Optional[List[folium.FeatureGroup]] = None
+    ):
+        self.script = script
+        self.header = header
+        self.html = html
+        self.map_id = map_id
+        self.feature_group = feature_group
+        self.css_links = css_links
+        self.js_links = js_links
+        self.bounds = bounds
+        self.zoom = zoom
+        # 表示のたびにページに出すメッセージ（データの欠損など・レイヤーの読み込みの失敗）
+        self.warnings = warnings or []
+        self.errors = errors or []
+        # 一部のレイヤーの読み込みに失敗した地図は保存しない
+        self.complete = complete
+        # シリアライズしていない地図（st_foliumにそのまま渡す）
+        self.folium_map = folium_map
+        self.feature_groups = feature_groups
+
+    @property
+    def serialized(self) -> bool:
+        """st_foliumのコンポーネントに渡す形にシリアライズ済みか"""
+        return self.folium_map is None
+
+    @property
+    def nbytes(self) -> int:
+        """保持している文字列のおおよそのメモリ使用量（バイト）"""
+        return sum(
+            len(text) for text in (self.script, self.header, self.html, self.feature_group)
+        )
+
+    def to_dict(self) -> dict:
+        return {field: getattr(self, field) for field in self.FIELDS}
+
+    @classmethod
+    def from_dict(cls, data: dict) -> 'RenderedMap':
+        return cls(**{field: data[field] for field in cls.FIELDS})
+
+    @classmethod
+    def unserialized(
+        cls,
+        folium_map: folium.Map,
+        feature_groups: List[folium.FeatureGroup]
+    ) -> 'RenderedMap':
+        """st_foliumで表示するfoliumの地図（キャッシュには保存しない）"""
+        return cls(
+            script='', header='', html='', map_id='', feature_group='',
+            css_links=[], js_links=[], bounds=[], zoom=None,
+            folium_map=folium_map, feature_groups=feature_groups,
+        )
+
+def render_map(
+    folium_map: folium.Map,
+    feature_groups: List[folium.FeatureGroup]
+) -> RenderedMap:
+    """foliumの地図と差分として送るレイヤーを、st_foliumと同じ形にシリアライズする
+
+    streamlit_foliumのバージョンが異なる場合はシリアライズせずに返す
+    """
+    if not st_folium_shim.is_compatible():
+        return RenderedMap.unserialized(folium_map, feature_groups)
+    return RenderedMap(**st_folium_shim.serialize(folium_map, feature_groups))
+
+def source_version() -> str:
+    """地図の元になるファイル（人口・境界・学校）と描画方法のバージョン
+
+    元データのバージョンは地図の入力（cached_loadersのキャッシュ）のキーと同じものを使う
+    """
+    payload = (
+        f'{RENDER_CACHE_VERSION}:{st_folium_shim.UPSTREAM_VERSION}:'
+        f'{data_loader.source_version()}'
+    )
+    return hashlib.sha256(payload.encode()).hexdigest()[:16]
+
+def _disk_path(version: str, options: tuple) -> Path:
+    name = hashlib.sha256(repr(options).encode()).hexdigest()
+    return RENDER_CACHE_DIR / version / f'{name}.json'
+
+def _read_disk(version: str, options: tuple) -> Optional[RenderedMap]:
+    """ディスクから描画済みの地図を読み込む（ない・壊れている場合はNone）"""
+    try:
+        with open(_disk_path(version, options), encoding='utf-8') as f:
+            return RenderedMap.from_dict(json.load(f))
+    except (OSError, ValueError, KeyError, TypeError):
+        return None
+
+def _write_disk(version: str, options: tuple, rendered: RenderedMap) -> None:
+    """描画済みの地図をディスクに保存し、古いバージョンと上限を超えた分を削除する"""
+    path = _disk_path(version, options)
+    path.parent.mkdir(parents=True, exist_ok=True)
+
+    # 書き込み途中のファイルを読まないよう、一時ファイルから置き換える
+    tmp_path = path.with_suffix('.tmp')
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(rendered.to_dict(), f, ensure_ascii=False)
+    tmp_path.replace(path)
+
+    # 元データが変わる前のバージョンは二度と使われない
+    for directory in RENDER_CACHE_DIR.iterdir():
+        if directory.is_dir() and directory.name != version:
+            shutil.rmtree(directory, ignore_errors=True)
+
+    files = sorted(path.parent.glob('*.json'), key=lambda file: file.stat().st_mtime)
+    for file in files[:-RENDERED_MAP_DISK_MAX_FILES]:
+        file.unlink(missing_ok=True)
+
+def get_rendered_map(
+    options: tuple,
+    build: Callable[[], RenderedMap]
+) -> RenderedMap:
+    """表示設定の組み合わせに対応する描画済みの地図を取得する
+
+    共有キャッシュ → ディスク → buildの順に探し、元データのバージョンが
+    変わった場合は作り直す
+
+    Args:
+        options: 地図の内容を決める表示設定（ハッシュ可能な値のタプル）
+        build: 地図を組み立ててrender_mapで描画する関数
+    """
+    if not st_folium_shim.is_compatible():
+        # シリアライズできないため、表示のたびに組み立てる
+        profiling.cache_miss('rendered_map')
+        return build()
+
+    version = source_version()
+
+    def load() -> RenderedMap:
+        rendered = _read_disk(version, options) if RENDERED_MAP_DISK_CACHE else None
+        if rendered is not None:
+            profiling.count('rendered_map.disk_hits')
+            return rendered
+
+        profiling.cache_miss('rendered_map')
+        rendered = build()
+        # 組み立て中に元データが更新された場合は、入力がどちらのバージョンで
+        # 読み込まれたか分からないため、共有キャッシュにもディスクにも残さない
+        # （completeでない地図は共有キャッシュに保存されない）
+        if source_version() != version:
+            rendered.complete = False
+        if rendered.complete and RENDERED_MAP_DISK_CACHE:
+            try:
+                _write_disk(version, options, rendered)
+            except OSError:
+                # 書き込めない環境ではメモリ上のキャッシュのみを使う
+                pass
+        return rendered
+
+    cache = get_frame_cache()
+    key = (__name__, 'rendered_map', (version,) + options)
+    with profiling.cache_call('rendered_map'):
+        rendered = cache.get_or_load(key, load, cacheable=lambda rendered: rendered.complete)
+    profiling.record_size('rendered_map', rendered.nbytes)
+    return rendered
+
+def show_rendered_map(
+    rendered: RenderedMap,
+    key: str,
+    height: int = 700,
+    returned_objects: Optional[List[str]] = None
+) -> dict:
+    """描画済みの地図をst_foliumのコンポーネントで表示する（幅はコンテナに合わせる）
+
+    st_folium(use_container_width=True)と同じ引数でコンポーネントを呼び出すため、
+    ブラウザ側の地図は同じように再利用され、差分のレイヤーだけが置き換わる
+    """
+    if not rendered.serialized:
+        from streamlit_folium import st_folium
+
+        return st_folium(
+            rendered.folium_map,
+            key=key,
+            height=height,
+            returned_objects=returned_objects,
+            feature_group_to_add=rendered.feature_groups,
+            use_container_width=True
+        )
+
+    return st_folium_shim.show(
+        {field: getattr(rendered, field) for field in st_folium_shim.SERIALIZED_FIELDS},
+        key=key,
+        height=height,
+        returned_objects=returned_objects
+    )
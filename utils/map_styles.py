@@ -1,9 +1,23 @@
-# スタイル関数の定義
-STYLE_FUNC = lambda x: {
-    'fillColor': '#ffffff',
+# 人口ヒートマップの塗り分け設定
+CHOROPLETH_PALETTE = 'YlOrRd'
+CHOROPLETH_BINS = 6
+NAN_FILL_COLOR = 'darkgray'
+
+# 事前に計算した塗りつぶし色を格納するGeoJSONの属性名
+FILL_COLOR_PROPERTY = 'fill_color'
+
+# 人口ヒートマップの塗りつぶし色以外のスタイル
+POPULATION_STYLE = {
     'color': '#000000',
-    'fillOpacity': 0.1,
-    'weight': 0.1
+    'fillOpacity': 0.8,
+    'opacity': 0.2,
+    'weight': 1
+}
+
+# スタイル関数の定義
+POPULATION_STYLE_FUNC = lambda x: {
+    'fillColor': x['properties'][FILL_COLOR_PROPERTY],
+    **POPULATION_STYLE
 }
 
 HIGHLIGHT_FUNC = lambda x: {
@@ -22,4 +36,30 @@ TOOLTIP_STYLE = (
 # 中心地点ラベルのスタイル
 CENTER_LABEL_STYLE = (
     'font-size: 8px; color: #999999; text-align: center;'
-) 
\ No newline at end of file
+)
+
+# エリアラベル（canvasに描画）のスタイル
+AREA_LABEL_FONT = '8px sans-serif'
+AREA_LABEL_COLOR = '#999999'
+
+# 月スライダーの設定
+SLIDER_INDEX_PROPERTY = 'town_index'
+SLIDER_INTERVAL_MS = 800
+SLIDER_CONTROL_STYLE = (
+    'background-color: white; padding: 6px 10px; '
+    'font-family: arial; font-size: 12px;'
+)
+
+# 施設の種別ごとのマーカー（Font Awesomeのアイコンと色）
+FACILITY_MARKER_STYLES = {
+    '小学校': {'color': 'red', 'icon': 'graduation-cap'},
+    '中学校': {'color': 'blue', 'icon': 'graduation-cap'},
+}
+FACILITY_DEFAULT_STYLE = {'color': 'gray', 'icon': 'info'}
+
+# 施設マーカーのクラスタ設定（初期表示のズームでは1つずつ表示する）
+FACILITY_CLUSTER_OPTIONS = {
+    'disableClusteringAtZoom': 14,
+    'showCoverageOnHover': False,
+    'spiderfyOnMaxZoom': False,
+}
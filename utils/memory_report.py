@@ -0,0 +1,90 @@
+"""プロセス内に保持しているデータのメモリ使用量の集計"""
+from typing import List
+
+import pandas as pd
+
+from core.frame_cache import frame_nbytes, get_frame_cache
+
+def _store_rows() -> List[dict]:
+    """カラムナーストアから読み込んだ月ごとのデータフレーム"""
+    from core.population_store import _loaded_store
+
+    rows = []
+    shared_categories = {}
+    for (year, sheet_name), df in _loaded_store['sheets'].items():
+        rows.append({
+            'cache': 'population_store',
+            'key': f'{year}:{sheet_name}',
+            'rows': len(df),
+            'bytes': frame_nbytes(df),
+        })
+        # 全ての月で共有しているカテゴリの集合は1回だけ数える
+        for column, dtype in df.dtypes.items():
+            if isinstance(dtype, pd.CategoricalDtype):
+                shared_categories[column] = dtype.categories
+    for column, categories in shared_categories.items():
+        rows.append({
+            'cache': 'population_store',
+            'key': f'カテゴリ: {column}',
+            'rows': len(categories),
+            'bytes': int(categories.memory_usage(deep=True)),
+        })
+    return rows
+
+def _frame_cache_rows() -> List[dict]:
+    """全セッションで共有しているキャッシュ"""
+    rows = []
+    for key, nbytes in get_frame_cache().entry_sizes():
+        name, args = key[1], key[2]
+        rows.append({
+            'cache': 'frame_cache',
+            'key': f"{name}({', '.join(map(str, args))})",
+            'rows': None,
+            'bytes': nbytes,
+        })
+    return rows
+
+def _geometry_rows() -> List[dict]:
+    """町丁目の境界データ（読み込み済みの場合のみ）"""
+    from core import geometry_registry
+
+    # 座標1点あたりx・yの2つのfloat64
+    def geometry_nbytes(geometry) -> int:
+        import shapely
+        return int(shapely.get_num_coordinates(geometry.values).sum()) * 16
+
+    rows = []
+    town_geometry = geometry_registry._town_geometry
+    if town_geometry is not None:
+        # 月ごとのデータフレームと共有している属性カラムもここで1回だけ数える
+        attributes = pd.DataFrame(town_geometry.drop(columns=town_geometry.geometry.name))
+        rows.append({
+            'cache': 'geometry_registry',
+            'key': 'town_geometry',
+            'rows': len(town_geometry),
+            'bytes': geometry_nbytes(town_geometry.geometry) + frame_nbytes(attributes),
+        })
+    for level, geometry in sorted(geometry_registry._simplified_geometry.items()):
+        rows.append({
+            'cache': 'geometry_registry',
+            'key': f'lod{level}',
+            'rows': len(geometry),
+            'bytes': geometry_nbytes(geometry),
+        })
+    if geometry_registry._label_points is not None:
+        rows.append({
+            'cache': 'geometry_registry',
+            'key': 'label_points',
+            'rows': len(geometry_registry._label_points),
+            'bytes': frame_nbytes(geometry_registry._label_points),
+        })
+    return rows
+
+def memory_report() -> pd.DataFrame:
+    """データフレーム・キャッシュごとのメモリ使用量（バイト）の一覧を返す
+
+    Returns:
+        pd.DataFrame: cache（保持している場所）・key・rows・bytesの列を持つ表
+    """
+    rows = _store_rows() + _frame_cache_rows() + _geometry_rows()
+    return pd.DataFrame(rows, columns=['cache', 'key', 'rows', 'bytes'])
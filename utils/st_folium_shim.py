@@ -0,0 +1,211 @@
+"""streamlit_foliumのst_foliumを「シリアライズ」と「コンポーネントの表示」に分けた互換層
+
+upstream: streamlit_folium 0.27.4 の streamlit_folium/__init__.py にある st_folium
+（https://github.com/randyzwitch/streamlit-folium/blob/v0.27.4/streamlit_folium/__init__.py）
+
+st_foliumは表示のたびにfoliumの地図をシリアライズするため、シリアライズ結果を
+保存しておけるよう、st_foliumの処理をこのモジュールに写している。写した処理は
+upstreamの内部の関数（_get_header・_component_funcなど）に依存するため、
+is_compatible()でインストールされているst_folium等のソースがupstreamと一致する
+場合だけ使い、一致しない場合は呼び出し側が公開APIのst_foliumを使う
+
+streamlit_foliumを更新したときは、以下で一致しない関数を確認できる
+（一致しない関数がある場合は終了コード1）
+
+    $ python -m utils.st_folium_shim
+"""
+import hashlib
+import logging
+from typing import List, Optional
+
+import folium
+
+# 写した処理の元になったstreamlit_foliumのバージョン（requirements.txtと合わせる）
+UPSTREAM_VERSION = '0.27.4'
+
+# 写した処理が依存するupstreamの関数と、そのソースのSHA-256（先頭16文字）
+# streamlit_foliumを更新するときは、このモジュールを新しいst_foliumと見比べてから更新する
+UPSTREAM_SOURCE_SHA256 = {
+    'st_folium': 'd8bc43db4fa155aa',
+    '_get_map_string': 'f3768099dc6b2c94',
+    '_get_header': '015c0911fe0f1fa9',
+    '_get_html': 'c50a5393eaa199a9',
+    '_get_feature_group_string': 'e976426fda05246d',
+    'generate_js_hash': '126b9f270d78bbc6',
+    'get_full_id': 'f2504cd646622c09',
+}
+
+# serializeが返し、showが受け取る地図の内容
+SERIALIZED_FIELDS = (
+    'script', 'header', 'html', 'map_id', 'feature_group',
+    'css_links', 'js_links', 'bounds', 'zoom',
+)
+
+logger = logging.getLogger(__name__)
+
+_compatible: Optional[bool] = None
+
+def upstream_mismatches() -> List[str]:
+    """インストールされているstreamlit_foliumのうち、upstreamと一致しない関数の名前"""
+    import inspect
+
+    import streamlit_folium
+
+    mismatches = []
+    for name, expected in UPSTREAM_SOURCE_SHA256.items():
+        try:
+            source = inspect.getsource(getattr(streamlit_folium, name))
+        except (AttributeError, OSError, TypeError):
+            mismatches.append(name)
+            continue
+        if hashlib.sha256(source.encode()).hexdigest()[:16] != expected:
+            mismatches.append(name)
+    if not hasattr(streamlit_folium, '_component_func'):
+        mismatches.append('_component_func')
+    return mismatches
+
+def is_compatible() -> bool:
+    """写した処理をインストールされているstreamlit_foliumで使えるか（結果はプロセス内で保持）"""
+    global _compatible
+
+    if _compatible is None:
+        try:
+            mismatches = upstream_mismatches()
+        except ImportError:
+            mismatches = ['streamlit_folium']
+        _compatible = not mismatches
+        if mismatches:
+            logger.warning(
+                'streamlit_foliumが%sと異なるため、描画済みの地図のキャッシュを使いません: %s',
+                UPSTREAM_VERSION, ', '.join(mismatches)
+            )
+    return _compatible
+
+def serialize(
+    folium_map: folium.Map,
+    feature_groups: List[folium.FeatureGroup]
+) -> dict:
+    """st_foliumがコンポーネントに渡す地図の内容を作る（st_foliumの前半）"""
+    from streamlit_folium import (
+        _get_feature_group_string, _get_header, _get_html, _get_map_string, get_full_id
+    )
+
+    folium_map.get_root().render()
+    folium_map.render()
+
+    # _get_map_stringは地図の構造を変更するため、HTMLとヘッダーを先に取り出す
+    html = _get_html(folium_map)
+    header = _get_header(folium_map)
+    script = _get_map_string(folium_map)
+    map_id = get_full_id(folium_map)
+    bounds = folium_map.get_bounds()
+
+    feature_group = ''.join(
+        _get_feature_group_string(group, map=folium_map, idx=idx)
+        for idx, group in enumerate(feature_groups)
+    )
+
+    css_links, js_links = _collect_links(folium_map)
+    return {
+        'script': script,
+        'header': header,
+        'html': html,
+        'map_id': map_id,
+        'feature_group': feature_group,
+        'css_links': css_links,
+        'js_links': js_links,
+        'bounds': bounds,
+        'zoom': folium_map.options.get('zoom'),
+    }
+
+def _collect_links(folium_map: folium.Map) -> tuple[List[str], List[str]]:
+    """地図と子要素が必要とするCSS・JavaScriptのURL（重複なし）"""
+    import branca
+
+    css_links: List[str] = []
+    js_links: List[str] = []
+
+    def walk(element):
+        if isinstance(element, branca.colormap.ColorMap):
+            # 凡例はd3.jsで描画される
+            js_links.insert(0, 'https://cdnjs.cloudflare.com/ajax/libs/d3/3.5.5/d3.min.js')
+            js_links.insert(0, 'https://d3js.org/d3.v4.min.js')
+        css_links.extend(href for _, href in getattr(element, 'default_css', []))
+        js_links.extend(src for _, src in getattr(element, 'default_js', []))
+        for child in getattr(element, '_children', {}).values():
+            walk(child)
+
+    walk(folium_map)
+    return list(dict.fromkeys(css_links)), list(dict.fromkeys(js_links))
+
+def show(
+    serialized: dict,
+    key: str,
+    height: int,
+    returned_objects: Optional[List[str]]
+) -> dict:
+    """serializeの結果をst_folium(use_container_width=True)と同じ引数で表示する（st_foliumの後半）"""
+    import streamlit as st
+    from streamlit_folium import _component_func, generate_js_hash
+
+    southwest, northeast = serialized['bounds']
+    defaults = {
+        'last_clicked': None,
+        'last_object_clicked': None,
+        'last_object_clicked_count': None,
+        'last_object_clicked_tooltip': None,
+        'last_object_clicked_popup': None,
+        'all_drawings': None,
+        'last_active_drawing': None,
+        'bounds': {
+            '_southWest': {'lat': southwest[0], 'lng': southwest[1]},
+            '_northEast': {'lat': northeast[0], 'lng': northeast[1]},
+        },
+        'zoom': serialized['zoom'],
+        'last_circle_radius': None,
+        'last_circle_polygon': None,
+        'selected_layers': None,
+        'selected_tags': None,
+        'last_geocoder_result': None,
+    }
+    if returned_objects is not None:
+        defaults = {
+            name: value for name, value in defaults.items() if name in returned_objects
+        }
+
+    hash_key = generate_js_hash(serialized['script'], key, False)
+
+    def on_change():
+        # st_foliumと同様に、操作の結果をkeyのセッションステートにも入れる
+        st.session_state[key] = st.session_state.get(hash_key, {})
+
+    return _component_func(
+        script=serialized['script'],
+        header=serialized['header'],
+        html=serialized['html'],
+        id=serialized['map_id'],
+        key=hash_key,
+        height=height,
+        width=None,
+        returned_objects=returned_objects,
+        default=defaults,
+        zoom=None,
+        center=None,
+        feature_group=serialized['feature_group'],
+        return_on_hover=False,
+        layer_control=None,
+        pixelated=False,
+        css_links=serialized['css_links'],
+        js_links=serialized['js_links'],
+        on_change=on_change,
+        wrap_longitude=False,
+    )
+
+if __name__ == '__main__':
+    import sys
+
+    mismatches = upstream_mismatches()
+    if mismatches:
+        print(f'streamlit_folium {UPSTREAM_VERSION}と一致しません: {", ".join(mismatches)}')
+        sys.exit(1)
+    print(f'streamlit_folium {UPSTREAM_VERSION}と一致します')
@@ -1,52 +1,157 @@
+import json
+
+import pandas as pd
 import streamlit as st
 
-def display_metrics(current_df, previous_df):
+from core import profiling
+from core.exceptions import SheetParseError
+from core.frame_cache import get_frame_cache
+from utils.memory_report import memory_report
+from core.town_index import get_unmatched_names
+
+def display_metrics(current, year_delta=None, month_delta=None):
     """メトリクスを表示
     
     Args:
-        current_df (pd.DataFrame): 現在の人口データ
-        previous_df (pd.DataFrame): 1年前の人口データ（Noneの場合もある）
+        current (dict): 表示する年月の市全体の合計（指標名 → 値）
+        year_delta (dict): 1年前からの増減（Noneの場合もある）
+        month_delta (dict): 前月からの増減（Noneの場合もある）
     """
-    from utils.data_loader import ColumnNames
+    from core.data_loader import ColumnNames
     
     col1, col2, col3, col4 = st.columns(4)
 
     # 人口総数
-    total_population = current_df[ColumnNames.POPULATION].sum()
-    previous_population = previous_df[ColumnNames.POPULATION].sum() if previous_df is not None else None
     with col1:
-        st.metric(
-            label="総人口",
-            value=f"{int(total_population):,}人",
-            delta=f"1年前から{int(total_population - previous_population):+,}人" if previous_population is not None else None
-        )
+        _display_metric('総人口', ColumnNames.POPULATION, '人', current, year_delta, month_delta)
 
     # 世帯総数
-    total_households = current_df[ColumnNames.HOUSEHOLDS].sum()
-    previous_households = previous_df[ColumnNames.HOUSEHOLDS].sum() if previous_df is not None else None
     with col2:
-        st.metric(
-            label="総世帯数",
-            value=f"{int(total_households):,}世帯",
-            delta=f"1年前から{int(total_households - previous_households):+,}世帯" if previous_households is not None else None
-        )
+        _display_metric('総世帯数', ColumnNames.HOUSEHOLDS, '世帯', current, year_delta, month_delta)
 
     # 男性総数
-    total_male = current_df[ColumnNames.MALE].sum()
-    previous_male = previous_df[ColumnNames.MALE].sum() if previous_df is not None else None
     with col3:
-        st.metric(
-            label="男性人口",
-            value=f"{int(total_male):,}人",
-            delta=f"1年前から{int(total_male - previous_male):+,}人" if previous_male is not None else None
-        )
+        _display_metric('男性人口', ColumnNames.MALE, '人', current, year_delta, month_delta)
 
     # 女性総数
-    total_female = current_df[ColumnNames.FEMALE].sum()
-    previous_female = previous_df[ColumnNames.FEMALE].sum() if previous_df is not None else None
     with col4:
-        st.metric(
-            label="女性人口",
-            value=f"{int(total_female):,}人",
-            delta=f"1年前から{int(total_female - previous_female):+,}人" if previous_female is not None else None
-        ) 
\ No newline at end of file
+        _display_metric('女性人口', ColumnNames.FEMALE, '人', current, year_delta, month_delta)
+
+def _display_metric(label, metric, unit, current, year_delta, month_delta):
+    """1つの指標の値と、1年前・前月からの増減を表示"""
+    st.metric(
+        label=label,
+        value=f"{int(current[metric]):,}{unit}",
+        delta=f"1年前から{int(year_delta[metric]):+,}{unit}" if year_delta is not None else None
+    )
+    # 前月からの増減は2つ目の差分として常に表示する（前月のデータがない場合はその旨を表示）
+    if month_delta is not None:
+        st.caption(f"前月から{int(month_delta[metric]):+,}{unit}")
+    else:
+        st.caption('前月のデータなし')
+
+def display_data_error(error):
+    """coreの読み込みで発生した例外をページに表示
+
+    Args:
+        error (core.exceptions.ChofuDataError): 読み込みで発生した例外
+    """
+    st.error(str(error))
+    if isinstance(error, SheetParseError):
+        st.error(error.detail)
+
+def display_sheet_catalog_errors():
+    """シートの一覧を作るときに読み込めなかったワークブックを表示"""
+    from core.sheet_catalog import get_sheet_catalog
+
+    for file_path, error in get_sheet_catalog().errors.items():
+        st.error(f'{file_path}の読み込みに失敗しました: {error}')
+
+def is_debug_mode() -> bool:
+    """計測を有効にするか（環境変数またはURLの ?debug=1 で有効）"""
+    return profiling.enabled_by_env() or st.query_params.get('debug') == '1'
+
+def display_debug_panel(trace):
+    """サイドバーに再実行ごとの計測結果を表示
+
+    Args:
+        trace (profiling.Trace): 計測を終えたトレース
+    """
+    with st.sidebar:
+        with st.expander('🛠️ 計測結果', expanded=False):
+            st.caption(f'再実行の合計: {trace.total_ms:,.1f} ms')
+
+            # 区間は開始順に並べ、入れ子の深さで字下げする
+            spans = sorted(trace.spans, key=lambda span: span['start_ms'])
+            st.dataframe(
+                pd.DataFrame({
+                    '区間': ['　' * span['depth'] + span['name'] for span in spans],
+                    '開始 (ms)': [span['start_ms'] for span in spans],
+                    '処理時間 (ms)': [span['duration_ms'] for span in spans],
+                }),
+                hide_index=True,
+                use_container_width=True
+            )
+
+            caches = trace.caches()
+            if caches:
+                st.markdown('**キャッシュ**')
+                st.dataframe(
+                    pd.DataFrame.from_dict(caches, orient='index'),
+                    use_container_width=True
+                )
+
+            if trace.sizes:
+                st.markdown('**データサイズ**')
+                st.dataframe(
+                    pd.DataFrame({
+                        'KB': {name: size / 1024 for name, size in trace.sizes.items()}
+                    }),
+                    use_container_width=True
+                )
+
+            # プロセス全体で共有しているキャッシュの状態
+            frame_stats = get_frame_cache().stats()
+            st.markdown('**共有キャッシュ**')
+            st.caption(
+                f"{frame_stats['entries']}件 / "
+                f"{frame_stats['bytes'] / 1024 ** 2:,.1f} MB "
+                f"（上限 {frame_stats['max_bytes'] / 1024 ** 2:,.0f} MB）・"
+                f"ヒット {frame_stats['hits']:,} / ミス {frame_stats['misses']:,} / "
+                f"破棄 {frame_stats['evictions']:,} / "
+                f"待ち合わせ {frame_stats['waits']:,} / "
+                f"期限切れ {frame_stats['stale_hits']:,}"
+            )
+
+            # 保持しているデータの場所ごとのメモリ使用量
+            report = memory_report()
+            if not report.empty:
+                st.markdown('**メモリ使用量**')
+                st.dataframe(
+                    report.groupby('cache').agg(
+                        件数=('key', 'size'), KB=('bytes', lambda b: b.sum() / 1024)
+                    ),
+                    use_container_width=True
+                )
+
+            # 境界データと結合できなかった住所（データが地図に表示されない）
+            unmatched = get_unmatched_names()
+            if unmatched:
+                st.markdown('**境界データにない住所**')
+                st.caption('、'.join(unmatched))
+
+            other_counters = {
+                name: value for name, value in trace.counters.items()
+                if not name.endswith(('.calls', '.misses'))
+            }
+            if other_counters:
+                st.markdown('**カウンター**')
+                st.json(other_counters)
+
+            st.download_button(
+                'トレースをダウンロード',
+                data=json.dumps(trace.to_dict(), ensure_ascii=False, indent=2),
+                file_name=f'trace_{trace.page}_{trace.started_at:%Y%m%d_%H%M%S}.json',
+                mime='application/json'
+            )
+            st.caption(f'全ての再実行の計測結果は {profiling.TRACE_PATH} に追記されます')
@@ -0,0 +1,119 @@
+"""起動直後のキャッシュの事前読み込みと、隣接する月の先読み
+
+重いモジュールはバックグラウンドのスレッド内でインポートするため、
+main.pyから読み込んでも起動時間は増えない
+"""
+import logging
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional, Set
+
+# 起動時に読み込んでおく最新の月数
+WARMUP_MONTHS = int(os.environ.get('CHOFU_WARMUP_MONTHS', '3'))
+
+# 起動時の事前読み込みを無効にする環境変数（"0"で無効）
+WARMUP_ENV = 'CHOFU_WARMUP'
+
+logger = logging.getLogger(__name__)
+
+_warmup_thread: Optional[threading.Thread] = None
+_lock = threading.Lock()
+
+# 先読みは1スレッドで順番に行い、表示中の再実行とCPUを奪い合わないようにする
+_prefetch_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='prefetch')
+_pending: Set[str] = set()
+
+def _warm_up(n_months: int) -> None:
+    """最新の月のデータ・集計表・履歴・学校の位置・境界データをキャッシュに読み込む"""
+    from utils.cached_loaders import (
+        load_cached_data, load_cached_history, load_cached_school_points,
+        load_cached_totals
+    )
+    from utils.constants import SCHOOL_DATA_PATH
+    from core.geometry_registry import (
+        LOD_LEVELS, get_label_points, get_town_geometry_lod
+    )
+    from core.sheet_catalog import get_sheet_catalog
+
+    catalog = get_sheet_catalog()
+    for entry in catalog.entries[:n_months]:
+        load_cached_data(entry.sheet_info)
+    load_cached_totals()
+    load_cached_history()
+    load_cached_school_points(SCHOOL_DATA_PATH)
+
+    # 地図で使うラベル位置と簡略化した境界
+    get_label_points()
+    for level in range(len(LOD_LEVELS)):
+        get_town_geometry_lod(level)
+
+def _run_warmup(n_months: int) -> None:
+    try:
+        _warm_up(n_months)
+        logger.info('キャッシュの事前読み込みが完了しました')
+    except Exception:
+        # 失敗してもページ側で通常通り読み込まれる
+        logger.exception('キャッシュの事前読み込みに失敗しました')
+
+def start_warmup(n_months: int = WARMUP_MONTHS) -> None:
+    """プロセスで最初の呼び出し時にバックグラウンドで事前読み込みを開始する
+
+    2回目以降の呼び出しは何もしないため、再実行ごとに呼び出してよい
+    """
+    global _warmup_thread
+
+    if _warmup_thread is not None or os.environ.get(WARMUP_ENV) == '0':
+        return
+
+    with _lock:
+        if _warmup_thread is None:
+            _warmup_thread = threading.Thread(
+                target=_run_warmup, args=(n_months,), name='warmup', daemon=True
+            )
+            _warmup_thread.start()
+
+def adjacent_sheet_infos(sheet_info: str) -> List[str]:
+    """前月・翌月・1年前のシート情報を返す（存在するものだけ）"""
+    from core.sheet_catalog import get_sheet_catalog
+
+    catalog = get_sheet_catalog()
+    entry = catalog.get(sheet_info)
+    if entry is None:
+        return []
+
+    neighbours = [
+        catalog.find(entry.year + (entry.month == 12), entry.month % 12 + 1),
+        catalog.latest_before(entry.year, entry.month),
+        catalog.find(entry.year - 1, entry.month),
+    ]
+    return [
+        neighbour.sheet_info for neighbour in neighbours if neighbour is not None
+    ]
+
+def _prefetch(sheet_info: str) -> None:
+    from utils.cached_loaders import load_cached_data
+
+    try:
+        load_cached_data(sheet_info)
+    except Exception:
+        logger.exception('%sの先読みに失敗しました', sheet_info)
+    finally:
+        with _lock:
+            _pending.discard(sheet_info)
+
+def prefetch_adjacent_months(sheet_info: str) -> None:
+    """選択中の月の前月・翌月・1年前のデータを非同期に読み込む
+
+    キャッシュ済みの月や先読み中の月は読み込まない。現在の再実行は待たない
+    """
+    from utils.cached_loaders import load_cached_data
+
+    for neighbour in adjacent_sheet_infos(sheet_info):
+        if load_cached_data.is_cached(neighbour):
+            continue
+        with _lock:
+            if neighbour in _pending:
+                continue
+            _pending.add(neighbour)
+        _prefetch_executor.submit(_prefetch, neighbour)